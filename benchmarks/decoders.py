@@ -0,0 +1,90 @@
+"""Check that every decoder backend decodes exactly like the stdlib ``json``.
+
+Each case is decoded from text and from UTF-8 bytes by every installed
+backend. Results must match ``json.loads`` in type, value and key order,
+and inputs it rejects must raise the same exception with the same
+message. tests/test_decoders.py runs these cases under pytest; run this
+module as a script, or through ``python -m benchmarks.run --check`` to
+cover the generated workloads as well::
+
+    python -m benchmarks.decoders
+"""
+import json
+import sys
+
+from json_explorer.decoder import BACKENDS
+
+CASES = [
+    # Key order, duplicate keys and nesting
+    '{"b": 1, "a": 2, "c": {"z": [], "y": {}}}',
+    '{"a": 1, "b": 2, "a": 3}',
+    '[[1, [2, [3, {"d": [true, false, null]}]]]]',
+    # Integers at and past the 64-bit limits, and long digit runs in strings
+    '9223372036854775807', '-9223372036854775808', '-9223372036854775809',
+    '18446744073709551615', '18446744073709551616', '[1, 123456789012345678901234567890]',
+    '"12345678901234567890"',
+    # Floats: rounding, extremes, negative zero and out-of-range values
+    '0.1', '-0.0', '1.0', '-1.5E+3', '123.456e-7', '1e308', '1.7976931348623157e308', '5e-324',
+    '2.2250738585072011e-308', '1.00000000000000011102230246251565404236316680908203125',
+    '1e-400', '1E400', '-1e400', 'NaN', '[Infinity, -Infinity]',
+    # Unicode: escapes, surrogate pairs, lone surrogates, control characters and a byte order mark
+    '"caf\\u00e9"', '"café"', '"\\ud83d\\ude00"', '"😀"', '"\\ud800"', '"\\udc00x"', '{"ключ": "值"}',
+    '"\\u0000"', '"\\"\\\\\\/\\b\\f\\n\\r\\t"', '\ufeff{"bom": 1}',
+    # Invalid input
+    '', '   ', '[1,]', '{"a" 1}', '{"a": 1} x', '"\x01"', '[1, 2', 'tru', '01', '.5',
+]
+# Byte strings that are not valid UTF-8
+BYTE_CASES = [b'"\xff"', b'{"a": "\xc3"}', b'\xef\xbb\xbf[1]']
+
+
+def _same(a, b):
+    """Return True if two decoded values are equal in type, value and key order."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(_same(a[key], b[key]) for key in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_same, a, b))
+    if isinstance(a, float):
+        return repr(a) == repr(b)  # Tells -0.0 from 0.0 and compares NaN
+    return a == b
+
+
+def _outcome(loads, data):
+    try:
+        return True, loads(data)
+    except (ValueError, RecursionError) as e:
+        return False, (type(e), str(e))
+
+
+def check_decoders(inputs):
+    """Return a message for every input some backend decodes differently from ``json.loads``."""
+    failures = []
+    for data in inputs:
+        ok, expected = _outcome(json.loads, data)
+        for name, loads in BACKENDS.items():
+            decoded, result = _outcome(loads, data)
+            if ok != decoded or not (_same(expected, result) if ok else expected == result):
+                failures.append(f"{name}: {data[:60]!r}: expected {expected!r:.100}, got {result!r:.100}")
+    return failures
+
+
+def decoder_inputs(texts=()):
+    """Return every case, and every text given, as text and as UTF-8 bytes."""
+    inputs = []
+    for text in list(CASES) + list(texts):
+        inputs.append(text)
+        inputs.append(text.encode('utf-8', 'surrogatepass'))
+    return inputs + BYTE_CASES
+
+
+def main():
+    failures = check_decoders(decoder_inputs())
+    for message in failures:
+        print(f"MISMATCH {message}", file=sys.stderr)
+    print(f"{len(decoder_inputs())} inputs checked with {', '.join(BACKENDS)}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Synthetic inputs for the benchmarks.
+
+Every workload is generated from a seeded random.Random, so the same
+scale and seed always give byte-identical text. Run as a script to write
+one to stdout::
+
+    python -m benchmarks.generate wide --scale 2 > wide.json
+"""
+import argparse
+import json
+import random
+import sys
+
+WORDS = (
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel",
+    "india", "juliet", "kilo", "lima", "mike", "november", "oscar", "papa",
+)
+# Queries the benchmarks run against every workload; both occur in all of them
+KEY_QUERY = "name"
+VALUE_QUERY = "delta"
+# Filter the JSONL benchmarks run over flattened columns
+FILTER_EXPRESSION = "score > 50 and owner.name == 'delta' and active"
+
+
+def _words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def _item(rng, i):
+    return {
+        "id": i,
+        "name": _words(rng, 2),
+        "active": rng.random() < 0.5,
+        "score": round(rng.uniform(0, 100), 2),
+        "tags": [rng.choice(WORDS) for _ in range(rng.randint(0, 4))],
+        "owner": {"name": _words(rng, 1), "email": None if rng.random() < 0.2 else f"user{i}@example.com"},
+    }
+
+
+def deep_document(rng, scale):
+    """Chains of dicts nested 200 levels deep, each level holding a few leaves."""
+    chains = []
+    for c in range(max(1, int(50 * scale))):
+        node = {"name": _words(rng, 1), "value": rng.randint(0, 1000)}
+        for depth in range(200):
+            node = {"name": _words(rng, 1), "depth": depth, "items": [rng.randint(0, 9), _words(rng, 1)],
+                    "child": node}
+        chains.append(node)
+    return chains
+
+
+def wide_document(rng, scale):
+    """A dict with many keys, each holding a list of small records."""
+    keys = max(1, int(200 * scale))
+    return {f"{rng.choice(WORDS)}_{k}": [_item(rng, k * 50 + i) for i in range(50)] for k in range(keys)}
+
+
+def long_string_document(rng, scale):
+    """Records whose text fields are several kilobytes long."""
+    return [{"id": i, "name": _words(rng, 2), "body": _words(rng, rng.randint(500, 2000))}
+            for i in range(max(1, int(1000 * scale)))]
+
+
+def jsonl_records(rng, scale):
+    """Event-like records for JSON Lines input."""
+    records = []
+    for i in range(max(1, int(50_000 * scale))):
+        record = _item(rng, i)
+        record["event"] = {"type": rng.choice(WORDS), "payload": {"value": rng.randint(0, 10**6)}}
+        records.append(record)
+    return records
+
+
+# Workload name -> (builder, is JSONL)
+WORKLOADS = {
+    'deep': (deep_document, False),
+    'wide': (wide_document, False),
+    'long_strings': (long_string_document, False),
+    'jsonl': (jsonl_records, True),
+}
+
+
+def generate(workload, scale=1.0, seed=0):
+    """Return the text of a workload at the given scale."""
+    builder, is_jsonl = WORKLOADS[workload]
+    data = builder(random.Random(seed), scale)
+    if is_jsonl:
+        return "\n".join(json.dumps(record) for record in data) + "\n"
+    return json.dumps(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.generate',
+                                     description="Write a synthetic benchmark input to stdout.")
+    parser.add_argument('workload', choices=sorted(WORKLOADS))
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplier for the workload size")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    sys.stdout.write(generate(args.workload, args.scale, args.seed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Time the hot paths of the JSON Explorer on synthetic workloads.
+
+Each stage is timed ``--repeats`` times and then run once more under
+tracemalloc for its peak memory. Any inputs a stage needs are prepared
+outside the measured part. Results are written as JSON, and
+``--compare`` checks them against an earlier result file::
+
+    python -m benchmarks.run --output base.json
+    python -m benchmarks.run --compare base.json --tolerance 0.25
+
+The decode stages are timed once per installed decoder backend; every
+other stage uses the backend JSON_EXPLORER_DECODER selects, so the whole
+suite can be run per backend. ``--check`` instead verifies that every
+backend decodes the workloads and edge cases exactly like ``json``::
+
+    JSON_EXPLORER_DECODER=json python -m benchmarks.run --output json.json
+    python -m benchmarks.run --check
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from json_explorer.columns import ColumnStore, compile_filter
+from json_explorer.decoder import BACKEND, BACKENDS, loads
+from json_explorer.diff import subtree_hashes
+from json_explorer.node_index import NodeIndex
+from json_explorer.parsing import parse_text
+from json_explorer.paths import extract_paths
+from json_explorer.record_search import RecordSearch
+from json_explorer.search import PathSearch
+from json_explorer.values import RecordValueCounts, ValueIndex
+
+from .decoders import check_decoders, decoder_inputs
+from .generate import FILTER_EXPRESSION, KEY_QUERY, VALUE_QUERY, WORKLOADS, generate
+
+
+def document_stages(text):
+    """Return (stage, setup, run) for a single JSON document; ``run`` is called with setup()."""
+    json_obj = loads(text)
+    node_index = NodeIndex(json_obj)
+    value_index = ValueIndex(node_index)
+
+    def value_results():
+        return PathSearch(node_index).search_values(VALUE_QUERY)
+
+    def top_values(node_ids):
+        return value_index.top(20, value_index.value_ids(node_ids))
+
+    return [
+        ('parse', lambda: text, parse_text),
+        *((f'decode_{name}', lambda: text, backend) for name, backend in BACKENDS.items()),
+        ('extract_paths', lambda: json_obj, extract_paths),
+        ('node_index', lambda: json_obj, NodeIndex),
+        # Expand All marks every non-empty container as expanded
+        ('expand_all', lambda: node_index, lambda index: set().update(index.containers)),
+        ('key_filter', lambda: PathSearch(node_index), lambda search: search.search_keys(KEY_QUERY)),
+        # The first value query also builds the value index
+        ('value_filter', lambda: PathSearch(node_index), lambda search: search.search_values(VALUE_QUERY)),
+        ('value_index', lambda: node_index, ValueIndex),
+        ('subtree_hashes', lambda: node_index, subtree_hashes),
+        # Ranks the values of every value match, as the Path Finder value mode does
+        ('value_groups', value_results, top_values),
+    ]
+
+
+def jsonl_stages(text):
+    """Return (stage, setup, run) for JSON Lines input, searching every record like the app does."""
+    line_index = parse_text(text)
+    records = [line_index.record(i) for i in range(len(line_index))]
+    lines = [line_index.raw(i) for i in range(len(line_index))]
+
+    def decode_all(backend):
+        return lambda rows: [backend(row) for row in rows]
+
+    def search_all(mode, query):
+        return sum(len(batch) for batch in RecordSearch(line_index, query, mode, limit=sys.maxsize, workers=1))
+
+    record_filter = compile_filter(FILTER_EXPRESSION)
+    store = ColumnStore(line_index)
+    for _ in store.load(record_filter.paths):
+        pass
+
+    return [
+        ('parse', lambda: text, parse_text),
+        ('decode_records', lambda: line_index, lambda index: [index.record(i) for i in range(len(index))]),
+        *((f'decode_records_{name}', lambda: lines, decode_all(backend)) for name, backend in BACKENDS.items()),
+        ('extract_paths', lambda: records, lambda rows: [extract_paths(record) for record in rows]),
+        ('key_filter', lambda: 'keys', lambda mode: search_all(mode, KEY_QUERY)),
+        ('value_filter', lambda: 'values', lambda mode: search_all(mode, VALUE_QUERY)),
+        ('value_counts', lambda: line_index, lambda index: list(RecordValueCounts(index))),
+        ('flatten_columns', lambda: ColumnStore(line_index), lambda columns: list(columns.load(record_filter.paths))),
+        # The same filter as a vectorized pass over the flattened columns
+        ('column_filter', lambda: store, record_filter.evaluate),
+    ]
+
+
+def measure(setup, run, repeats):
+    times = []
+    for _ in range(repeats):
+        arg = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+
+    arg = setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds_min': min(times),
+        'seconds_median': statistics.median(times),
+        'repeats': repeats,
+        'peak_bytes': peak,
+    }
+
+
+def run_benchmarks(workloads, scale, seed, repeats, log=None):
+    results = []
+    for workload in workloads:
+        text = generate(workload, scale, seed)
+        _, is_jsonl = WORKLOADS[workload]
+        stages = jsonl_stages(text) if is_jsonl else document_stages(text)
+        for stage, setup, run in stages:
+            result = {'workload': workload, 'stage': stage, 'input_bytes': len(text.encode('utf-8'))}
+            result.update(measure(setup, run, repeats))
+            results.append(result)
+            if log:
+                log(f"{workload:>13} {stage:<22} {result['seconds_min']:9.4f}s "
+                    f"{result['peak_bytes'] / 1024 / 1024:9.1f} MB peak")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a message for every stage that is slower or larger than ``baseline`` by more than ``tolerance``."""
+    previous = {(r['workload'], r['stage']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['workload'], result['stage']))
+        if before is None or before['input_bytes'] != result['input_bytes']:
+            continue  # Not comparable: new stage or different scale or seed
+        for field in ('seconds_min', 'peak_bytes'):
+            if before[field] and result[field] > before[field] * (1 + tolerance):
+                regressions.append(f"{result['workload']}/{result['stage']}: {field} "
+                                   f"{before[field]:.4g} -> {result[field]:.4g} "
+                                   f"(+{result[field] / before[field] - 1:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.splitlines()[0])
+    parser.add_argument('--workload', action='append', choices=sorted(WORKLOADS),
+                        help="workload to run; repeat for several (default: all)")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplier for every workload size")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help="write the JSON results here instead of stdout")
+    parser.add_argument('--compare', metavar='BASELINE', help="earlier results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative slowdown or memory growth before --compare fails")
+    parser.add_argument('--check', action='store_true',
+                        help="check that every decoder backend decodes like json instead of timing anything")
+    args = parser.parse_args(argv)
+
+    log = lambda message: print(message, file=sys.stderr)
+    workloads = args.workload or list(WORKLOADS)
+    if args.check:
+        texts = []
+        for workload in workloads:
+            text = generate(workload, args.scale, args.seed)
+            texts.extend(text.splitlines() if WORKLOADS[workload][1] else [text])
+        failures = check_decoders(decoder_inputs(texts))
+        for message in failures:
+            log(f"MISMATCH {message}")
+        log(f"{len(texts)} workload inputs and the edge cases checked with {', '.join(BACKENDS)}")
+        return 1 if failures else 0
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'scale': args.scale,
+            'seed': args.seed,
+            'repeats': args.repeats,
+            'decoder': BACKEND,
+        },
+        'results': run_benchmarks(workloads, args.scale, args.seed, args.repeats, log),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report['results'], json.load(f), args.tolerance)
+        for message in regressions:
+            log(f"REGRESSION {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Helpers for the Advanced JSON Explorer that do not depend on Streamlit."""
@@ -0,0 +1,93 @@
+import hashlib
+from collections import OrderedDict
+
+
+def content_key(data):
+    """Return a short hex digest identifying the contents of ``data``."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and total weight.
+
+    Each entry carries a weight (for example the size in bytes of the input it
+    was built from). Inserting an entry evicts the least recently used ones
+    until both limits hold again; the newest entry and the ``pinned`` key are
+    always kept. ``on_evict(key, value)`` is called for every entry evicted or
+    cleared, e.g. to release a file it maps.
+    """
+
+    def __init__(self, max_entries=8, max_weight=None, on_evict=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.on_evict = on_evict
+        self.pinned = None
+        self._entries = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value, _ = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, weight=1):
+        if key in self._entries:
+            self.weight -= self._entries.pop(key)[1]
+        self._entries[key] = (value, weight)
+        self.weight += weight
+        while len(self._entries) > self.max_entries or (self.max_weight is not None and self.weight > self.max_weight):
+            evicted = next(k for k in self._entries if k != self.pinned)
+            if evicted == key:
+                break  # Only the pinned entry is older
+            evicted_value, evicted_weight = self._entries.pop(evicted)
+            self.weight -= evicted_weight
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted, evicted_value)
+
+    def get_or_create(self, key, factory, weight=1):
+        """Return the entry for ``key``, building it with ``factory()`` on a miss.
+
+        ``weight`` may be a function of the new value when its size is only
+        known once it is built.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value, weight(value) if callable(weight) else weight)
+        return value
+
+    def clear(self):
+        entries, self._entries = self._entries, OrderedDict()
+        self.weight = 0
+        if self.on_evict is not None:
+            for key, (value, _) in entries.items():
+                self.on_evict(key, value)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'weight': self.weight,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+_MISSING = object()
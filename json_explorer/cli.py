@@ -0,0 +1,181 @@
+"""Command-line access to the JSON Explorer core, without Streamlit.
+
+Writes one JSON object per line to stdout, for example::
+
+    python -m json_explorer paths data.json
+    python -m json_explorer search export.jsonl user --limit 10
+    cat data.json | python -m json_explorer search - 42 --values --code
+    python -m json_explorer query export.jsonl "data['items'][*]['id']"
+"""
+import argparse
+import json
+import os
+import sys
+
+from .codegen import generate_python_code
+from .lazy import LazyDocument, LazyValue
+from .line_index import LineIndex
+from .parsing import parse_buffer, parse_path
+from .paths import format_value_preview, iter_leaves
+from .query import QueryError, RecordQuery, compile_query
+from .record_search import leaf_matches, raw_prefilter
+
+
+def open_input(name):
+    """Parse a file, or standard input for '-', the way the app does."""
+    if name == '-':
+        return parse_buffer(sys.stdin.buffer.read(), '<stdin>')
+    return parse_path(name)
+
+
+def iter_units(parsed, prefilter=None):
+    """Yield (line number, leaves) for every JSONL record, or (None, leaves) for a single document.
+
+    JSONL lines whose raw bytes do not match ``prefilter`` are skipped
+    without being decoded. Lines that are not valid JSON are reported on
+    stderr and skipped.
+    """
+    if isinstance(parsed, LineIndex):
+        buffer = parsed.buffer
+        for i in range(len(parsed)):
+            start, end = parsed.span(i)
+            if prefilter is not None and not prefilter.search(buffer, start, end):
+                continue
+            try:
+                record = parsed.record(i)
+            except ValueError as e:
+                print(f"line {parsed.line_number(i)}: not valid JSON: {e}", file=sys.stderr)
+                continue
+            yield parsed.line_number(i), iter_leaves(record)
+    elif isinstance(parsed, LazyDocument):
+        yield None, parsed.iter_leaves()
+    else:
+        yield None, iter_leaves(parsed)
+
+
+def _preview(value):
+    if isinstance(value, (dict, list)):
+        return "{}" if isinstance(value, dict) else "[]"
+    return format_value_preview(value)
+
+
+def _row(line, path, code, **fields):
+    row = {} if line is None else {'line': line}
+    row['path'] = path
+    row.update(fields)
+    if code:
+        row['code'] = generate_python_code(path)
+    return row
+
+
+def run_paths(args, parsed, write):
+    for line, leaves in iter_units(parsed):
+        for path, _, value in leaves:
+            write(_row(line, path, args.code, value=value))
+
+
+def run_search(args, parsed, write):
+    query = args.query.lower()
+    mode = 'values' if args.values else 'keys'
+    prefilter = raw_prefilter(query, mode) if isinstance(parsed, LineIndex) else None
+    found = 0
+    for line, leaves in iter_units(parsed, prefilter):
+        for path, _, value in leaves:
+            if not leaf_matches(path, value, query, mode):
+                continue
+            write(_row(line, path, args.code, preview=_preview(value)))
+            found += 1
+            if found == args.limit:
+                return
+
+
+def run_query(args, parsed, write):
+    query = compile_query(args.query)
+    if isinstance(parsed, LineIndex):
+        record_query = RecordQuery(parsed, query, limit=args.limit)
+        for batch in record_query:
+            for record, path, value in batch:
+                write(_row(parsed.line_number(record), path, args.code, value=value))
+        if record_query.bad_lines:
+            print(f"skipped {record_query.bad_lines} lines that are not valid JSON", file=sys.stderr)
+        return
+    resolve = None
+    if isinstance(parsed, LazyDocument):
+        # Decode each subtree the query reaches, one at a time
+        document = parsed
+        resolve = lambda value: document.decode(value) if isinstance(value, LazyValue) else value
+        parsed = parsed.root
+    for found, (path, value) in enumerate(query.evaluate(parsed, resolve=resolve), 1):
+        write(_row(None, path, args.code, value=value))
+        if found == args.limit:
+            return
+
+
+def _positive_int(text):
+    """Parse a --limit value; argparse reports the error."""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m json_explorer',
+        description="Stream the paths of a JSON or JSONL file as JSON Lines.",
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, run, help):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('file', help="JSON or JSONL file, or - for standard input")
+        command.add_argument('--code', action='store_true', help="add the generated Python access code")
+        command.set_defaults(run=run)
+        return command
+
+    add_command('paths', run_paths, help="write every leaf path and its value")
+
+    search = add_command('search', run_search, help="write the leaf paths matching a Path Finder query")
+    search.add_argument('query', help="text to look for (case-insensitive)")
+    search.add_argument('--values', action='store_true', help="match values instead of paths")
+    search.add_argument('--limit', type=_positive_int, default=None, help="stop after this many matches")
+
+    query = add_command('query', run_query, help="write the matches of a wildcard path query")
+    query.add_argument('query', help="path query, e.g. \"data['items'][*]['id']\" or \"..['id']\"")
+    query.add_argument('--limit', type=_positive_int, default=None, help="stop after this many matches")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+
+    def write(row):
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    if args.run is run_query:
+        # Report a bad query before reading a possibly large input
+        try:
+            compile_query(args.query)
+        except QueryError as e:
+            print(f"Invalid query: {e}", file=sys.stderr)
+            return 2
+
+    try:
+        parsed = open_input(args.file)
+        args.run(args, parsed, write)
+        out.flush()
+    except OSError as e:
+        if isinstance(e, BrokenPipeError):
+            # The reader stopped early, e.g. `| head`; silence the flush at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        print(f"Cannot read {args.file}: {e}", file=sys.stderr)
+        return 2
+    except (ValueError, IndexError) as e:
+        print(f"Invalid JSON or JSONL data in {args.file}: {e}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,10 @@
+# Function to generate Python code for accessing a specific item
+def generate_python_code(path):
+    """Generate Python code to access a specific JSON path"""
+    code = "import json\n\n"
+    code += "# Load your JSON data\n"
+    code += "data = json.loads(json_string)  # Replace json_string with your JSON data\n\n"
+    code += f"# Access the specific path\n"
+    code += f"value = {path}\n"
+    code += "print(value)"
+    return code
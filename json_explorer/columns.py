@@ -0,0 +1,413 @@
+"""Typed columns of JSONL records, with vectorized filters and sorting.
+
+``ColumnStore`` flattens chosen paths of every record into NumPy arrays
+in one pass over the records and keeps them for later expressions. Each
+column has a ``null`` mask that is True where the record has no value at
+the path, holds null there, or is not valid JSON. A column is typed by the
+kind of value most records hold, so that one ``"age": "old"`` among
+numbers does not turn it into Python objects; comparisons treat values of
+another kind as unknown, like null.
+
+Filters are Python expressions over columns, evaluated on whole arrays::
+
+    age > 30 and address.city == 'Othertown'
+    data['tags'][0] in ('red', 'blue') or not active
+    score is None
+
+A column is named by its keys, either dotted (``address.city``) or as the
+app writes paths (``data['address']['city']``, ``items[0].id``); a leading
+``data`` followed by ``[`` is the record itself. A comparison involving a
+null value is neither true nor false, and ``not`` keeps it so, so ``not``
+and ``!=`` never match missing values; test for them with ``is None``.
+"""
+import ast
+import operator
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+from .decoder import loads
+from .paths import format_path_segment
+
+RECORDS_PER_BATCH = 5000
+# NumPy's variable-width string dtype, where available
+STRING_DTYPE = getattr(np.dtypes, 'StringDType', lambda: object)()
+
+_COMPARISONS = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+    ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+_ARITHMETIC = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+}
+# Kinds of values a column can be typed by, in the order ties between them go; ints and floats are both numbers
+_KIND_GROUPS = {bool: 'bool', int: 'number', float: 'number', str: 'str', type(None): 'null'}
+_GROUP_ORDER = ('number', 'str', 'bool', 'object')
+
+
+class ColumnError(ValueError):
+    """Raised for a filter or sort expression that cannot be parsed or evaluated."""
+
+
+def format_column(keys, root_path="data"):
+    return root_path + ''.join(format_path_segment(key) for key in keys)
+
+
+class Column:
+    """One path of every record: ``data`` holds the values and ``null`` marks where there are none.
+
+    ``data`` is typed by the kind of value most records hold there: 'bool',
+    'int', 'float' (numbers, some of them not integers or too large for
+    int64), 'str', 'object' (containers) or 'null' (no record has a value).
+    ``other`` marks the records holding a value of another kind; ``data``
+    has a placeholder there and ``others`` maps their indexes to the values.
+    """
+
+    __slots__ = ('keys', 'kind', 'data', 'null', 'other', 'others')
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        count = len(values)
+        self.null = np.fromiter((value is None for value in values), dtype=bool, count=count)
+        groups = [_KIND_GROUPS.get(type(value), 'object') for value in values]
+        counts = Counter(groups)
+        counts.pop('null', None)
+        # The most common kind types the column; values of other kinds are set aside
+        group = max(_GROUP_ORDER, key=counts.__getitem__) if counts else 'null'
+        self.other = np.fromiter((other not in (group, 'null') for other in groups), dtype=bool, count=count)
+        self.others = {int(i): values[i] for i in np.flatnonzero(self.other)}
+        typed = [None if other else value for value, other in zip(values, self.other)] if self.others else values
+        if group == 'null':
+            self.kind, self.data = 'null', np.zeros(count, dtype=bool)
+        elif group == 'bool':
+            self.kind, self.data = 'bool', np.fromiter((value is True for value in typed), dtype=bool, count=count)
+        elif group == 'number':
+            self.kind = 'int'
+            if any(type(value) is float for value in typed):
+                self.kind = 'float'
+            else:
+                try:
+                    self.data = np.array([0 if value is None else value for value in typed], dtype=np.int64)
+                except OverflowError:
+                    self.kind = 'float'
+            if self.kind == 'float':
+                self.data = np.array([np.nan if value is None else value for value in typed], dtype=np.float64)
+        elif group == 'str':
+            self.kind, self.data = 'str', np.array(['' if value is None else value for value in typed],
+                                                   dtype=STRING_DTYPE)
+        else:
+            self.kind = 'object'
+            self.data = np.empty(count, dtype=object)
+            self.data[:] = typed
+
+    @property
+    def name(self):
+        return format_column(self.keys)
+
+    @property
+    def unknown(self):
+        """Return the mask of records where comparisons with this column are neither true nor false."""
+        return self.null | self.other
+
+    def values(self, indices):
+        """Return the values of the records at ``indices`` as Python objects, None where there is none."""
+        values = self.data[indices].tolist()
+        nulls = self.null[indices].tolist()
+        return [None if null else self.others.get(int(i), value)
+                for i, value, null in zip(indices, values, nulls)]
+
+    def __len__(self):
+        return len(self.null)
+
+
+def _resolve(json_obj, keys):
+    """Return the value at ``keys`` inside a record, or None if there is none."""
+    for key in keys:
+        if isinstance(key, str):
+            if not isinstance(json_obj, dict):
+                return None
+            json_obj = json_obj.get(key)
+        else:
+            if not isinstance(json_obj, list) or not -len(json_obj) <= key < len(json_obj):
+                return None
+            json_obj = json_obj[key]
+    return json_obj
+
+
+class ColumnStore:
+    """Columns flattened from every record of a LineIndex, built on demand and kept.
+
+    ``load`` decodes every record once for all the columns it adds.
+    ``bad`` marks the records that are not valid JSON.
+    """
+
+    def __init__(self, line_index):
+        self.line_index = line_index
+        self.columns = {}
+        self.bad = None
+        self.records_done = 0
+
+    def __len__(self):
+        return len(self.line_index)
+
+    def missing(self, paths):
+        """Return the key tuples among ``paths`` that have no column yet."""
+        return [keys for keys in dict.fromkeys(paths) if keys not in self.columns]
+
+    def load(self, paths, records_per_batch=RECORDS_PER_BATCH):
+        """Flatten the paths that have no column yet; yields after every batch of records."""
+        paths = self.missing(paths)
+        if not paths:
+            return
+        line_index = self.line_index
+        buffer = line_index.buffer
+        columns = [[None] * len(line_index) for _ in paths]
+        bad = np.zeros(len(line_index), dtype=bool)
+        self.records_done = 0
+        for first in range(0, len(line_index), records_per_batch):
+            stop = min(first + records_per_batch, len(line_index))
+            starts, ends = line_index.spans(first, stop)
+            for n in range(stop - first):
+                try:
+                    json_obj = loads(buffer[starts[n]:ends[n]])
+                except ValueError:
+                    bad[first + n] = True
+                    continue
+                for values, keys in zip(columns, paths):
+                    values[first + n] = _resolve(json_obj, keys)
+            self.records_done = stop
+            yield
+        for keys, values in zip(paths, columns):
+            self.columns[keys] = Column(keys, values)
+        self.bad = bad
+
+    def valid(self):
+        """Return the mask of records that are valid JSON."""
+        return np.ones(len(self), dtype=bool) if self.bad is None else ~self.bad
+
+
+def _column_keys(node):
+    """Return the key tuple named by a Name/Attribute/Subscript chain, or None if it is not one."""
+    keys = []
+    subscripted = False
+    while True:
+        if isinstance(node, ast.Attribute):
+            keys.append(node.attr)
+            subscripted = False
+            node = node.value
+        elif isinstance(node, ast.Subscript):
+            key = node.slice
+            if (isinstance(key, ast.UnaryOp) and isinstance(key.op, ast.USub) and isinstance(key.operand, ast.Constant)
+                    and type(key.operand.value) is int):
+                key = ast.Constant(-key.operand.value)
+            if not isinstance(key, ast.Constant) or type(key.value) not in (str, int):
+                return None
+            keys.append(key.value)
+            subscripted = True
+            node = node.value
+        elif isinstance(node, ast.Name):
+            # data['a'] is the app's path notation for the record's key 'a'
+            if not (node.id == 'data' and subscripted):
+                keys.append(node.id)
+            break
+        else:
+            return None
+    keys.reverse()
+    return tuple(keys)
+
+
+def _constant(node):
+    """Return the value of a literal node, raising ColumnError for anything else."""
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        raise ColumnError(f"Expected a column or a literal, got {ast.unparse(node)!r}") from None
+
+
+class RecordFilter:
+    """A compiled filter expression; ``evaluate`` returns the mask of matching records."""
+
+    def __init__(self, expression):
+        self.expression = expression
+        try:
+            self._tree = ast.parse(expression.strip(), mode='eval').body
+        except SyntaxError as e:
+            raise ColumnError(f"Invalid filter expression: {e.msg}") from None
+        self.paths = []
+        for node in ast.walk(self._tree):
+            if isinstance(node, (ast.Call, ast.Lambda, ast.NamedExpr)):
+                raise ColumnError(f"Unsupported expression {ast.unparse(node)!r}; use comparisons of columns")
+            keys = _column_keys(node) if isinstance(node, (ast.Name, ast.Attribute, ast.Subscript)) else None
+            if keys is not None and not self._inside_column(node):
+                self.paths.append(keys)
+        self.paths = list(dict.fromkeys(self.paths))
+        if not self.paths:
+            raise ColumnError("The filter does not refer to any column")
+
+    def _inside_column(self, node):
+        """Return True if ``node`` is part of a longer column reference."""
+        for parent in ast.walk(self._tree):
+            if isinstance(parent, (ast.Attribute, ast.Subscript)) and parent.value is node:
+                return _column_keys(parent) is not None
+        return False
+
+    def evaluate(self, store):
+        """Return a boolean array over all records of ``store``; its columns must be loaded."""
+        try:
+            result, _ = self._truth(self._tree, store)
+        except (TypeError, ValueError) as e:
+            if isinstance(e, ColumnError):
+                raise
+            raise ColumnError(f"Cannot evaluate {self.expression!r}: {e}") from None
+        return np.broadcast_to(result, (len(store),)) & store.valid()
+
+    def _operand(self, node, store):
+        """Return (data, null, unknown) for a column, literal or arithmetic expression.
+
+        ``unknown`` adds to ``null`` the records holding a value of another
+        kind than the column's, which no comparison is true or false for.
+        """
+        keys = _column_keys(node) if isinstance(node, (ast.Name, ast.Attribute, ast.Subscript)) else None
+        if keys is not None:
+            column = store.columns[keys]
+            return column.data, column.null, column.unknown
+        if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+            left, left_null, left_unknown = self._operand(node.left, store)
+            right, right_null, right_unknown = self._operand(node.right, store)
+            with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                return (_ARITHMETIC[type(node.op)](left, right), left_null | right_null,
+                        left_unknown | right_unknown)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            data, null, unknown = self._operand(node.operand, store)
+            return -data, null, unknown
+        return _constant(node), False, False
+
+    def _truth(self, node, store):
+        """Return (true, false) boolean arrays (or bools) for a condition.
+
+        Where a comparison involves null the condition is neither true nor
+        false, and stays so under ``not``: three-valued logic as in SQL.
+        """
+        if isinstance(node, ast.BoolOp):
+            results = [self._truth(value, store) for value in node.values]
+            true, false = results[0]
+            for other_true, other_false in results[1:]:
+                if isinstance(node.op, ast.And):
+                    true, false = true & other_true, false | other_false
+                else:
+                    true, false = true | other_true, false & other_false
+            return true, false
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            true, false = self._truth(node.operand, store)
+            return false, true
+        if isinstance(node, ast.Compare):
+            return self._compare(node, store)
+        keys = _column_keys(node) if isinstance(node, (ast.Name, ast.Attribute, ast.Subscript)) else None
+        if keys is not None:
+            column = store.columns[keys]
+            if column.kind != 'bool':
+                raise ColumnError(f"{column.name} holds {column.kind} values; compare it to something")
+            known = ~column.unknown
+            return column.data & known, ~column.data & known
+        if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+            return np.bool_(node.value), np.bool_(not node.value)
+        raise ColumnError(f"Expected a condition, got {ast.unparse(node)!r}")
+
+    def _compare(self, node, store):
+        true, false = np.True_, np.False_
+        left_node = node.left
+        left = self._operand(left_node, store)
+        for op, right_node in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Is, ast.IsNot)) or (
+                    isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(right_node, ast.Constant)
+                    and right_node.value is None):
+                if not (isinstance(right_node, ast.Constant) and right_node.value is None):
+                    raise ColumnError("'is' only compares with None")
+                # Never null itself: a missing value is None
+                null = np.asarray(left[1], dtype=bool)
+                outcome = null if isinstance(op, (ast.Is, ast.Eq)) else ~null
+                true, false = true & outcome, false | ~outcome
+                continue
+            if isinstance(op, (ast.In, ast.NotIn)):
+                choices = _constant(right_node)
+                if not isinstance(choices, (list, tuple, set)):
+                    raise ColumnError("'in' needs a list or tuple of values")
+                data, _, unknown = left
+                found = np.isin(data, _choices_like(data, choices))
+                outcome = found if isinstance(op, ast.In) else ~found
+                true, false = true & outcome & ~unknown, false | (~outcome & ~unknown)
+                continue
+            right = self._operand(right_node, store)
+            try:
+                outcome = np.asarray(_COMPARISONS[type(op)](left[0], right[0]), dtype=bool)
+            except TypeError:
+                raise ColumnError(f"Cannot compare {ast.unparse(left_node)} with {ast.unparse(right_node)}: "
+                                  f"their types differ") from None
+            known = ~np.asarray(left[2], dtype=bool) & ~np.asarray(right[2], dtype=bool)
+            true, false = true & outcome & known, false | (~outcome & known)
+            left_node, left = right_node, right
+        return true, false
+
+
+def _choices_like(data, choices):
+    """Return the choices of the kind ``data`` holds; mixing in others would make NumPy compare them all as text."""
+    data = np.asarray(data)
+    if data.dtype.kind in 'biuf':
+        return [choice for choice in choices if isinstance(choice, (int, float))]
+    if data.dtype.kind in 'TU':
+        return [choice for choice in choices if isinstance(choice, str)]
+    return list(choices)
+
+
+@lru_cache(maxsize=256)
+def compile_filter(expression):
+    """Parse a filter expression once; compiled filters are cached by their text."""
+    return RecordFilter(expression)
+
+
+def parse_sort(text):
+    """Parse ``age desc, address.city`` into [(keys, descending)]."""
+    sort_keys = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        descending = False
+        words = part.rsplit(None, 1)
+        if len(words) == 2 and words[1].lower() in ('asc', 'desc'):
+            part, descending = words[0], words[1].lower() == 'desc'
+        try:
+            keys = _column_keys(ast.parse(part, mode='eval').body)
+        except SyntaxError:
+            keys = None
+        if keys is None:
+            raise ColumnError(f"Cannot sort by {part!r}; expected a column such as address.city")
+        sort_keys.append((keys, descending))
+    return sort_keys
+
+
+def sort_records(store, indices, sort_keys):
+    """Return ``indices`` ordered by the sort keys, nulls and values of other kinds last; ties keep their order."""
+    keys = []
+    for column_keys, descending in sort_keys:
+        column = store.columns[column_keys]
+        data, unknown = column.data[indices], column.unknown[indices]
+        if column.kind == 'int':
+            rank = data  # As float64, values above 2**53 would round and tie
+        elif column.kind in ('float', 'bool', 'null'):
+            rank = data.astype(np.float64)
+        else:
+            try:
+                rank = np.unique(data, return_inverse=True)[1]
+            except TypeError:
+                raise ColumnError(f"Cannot sort by {column.name}: it holds lists or objects") from None
+        keys.append(unknown)
+        if descending:
+            # ~ reverses integers without overflowing at the int64 minimum
+            rank = -rank if rank.dtype.kind == 'f' else ~rank
+        keys.append(rank)
+    # lexsort orders by its last key first
+    return indices[np.lexsort(keys[::-1])] if keys else indices
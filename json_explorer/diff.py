@@ -0,0 +1,153 @@
+"""Structural diff of two parsed documents using subtree hashes.
+
+``subtree_hashes`` gives every node of a NodeIndex a hash of its whole
+subtree in one bottom-up pass. ``diff_documents`` walks two documents
+from their roots and skips every pair of subtrees whose hashes are equal,
+so once the hashes exist its cost grows with the changes and the size of
+the containers holding them, not with the size of the documents.
+
+Hashes are 64-bit: two different subtrees are only taken for equal on a
+hash collision. Dict hashes depend on key order, which only costs
+skipping; dicts are still compared key by key.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+
+from .node_index import DICT, FLOAT, INT
+
+ADDED, REMOVED, CHANGED = 'added', 'removed', 'changed'
+# Differing stretches of two lists longer than this are first split at items unique to both
+LIST_ALIGN_LIMIT = 2000
+
+
+def subtree_hashes(node_index):
+    """Return an array with the hash of the subtree of every node."""
+    kind, values, key, keys = node_index.kind, node_index.values, node_index.key, node_index.keys
+    child_start, children = node_index.child_start, node_index.children
+    hashes = array('q', bytes(8 * len(kind)))
+    # Nodes are numbered in pre-order, so every child is hashed before its parent
+    for i in range(len(kind) - 1, -1, -1):
+        node_kind = kind[i]
+        first = child_start[i]
+        if first < 0:
+            value = values[i]
+            # repr keeps -1 and -2, or 1e300 and its integer hash twin, apart
+            hashes[i] = hash((node_kind, repr(value) if node_kind in (INT, FLOAT) else value))
+            continue
+        ids = children[first:first + len(values[i])]
+        if node_kind == DICT:
+            hashes[i] = hash((DICT, tuple([(keys[key[c]], hashes[c]) for c in ids])))
+        else:
+            hashes[i] = hash((node_kind, tuple([hashes[c] for c in ids])))
+    return hashes
+
+
+def _unique_anchors(old, new):
+    """Return the longest in-order run of (i, j) with old[i] == new[j] occurring once in each list.
+
+    This is the anchor step of patience diff: O(n log n) however the lists differ.
+    """
+    old_count, new_count = Counter(old), Counter(new)
+    new_position = {h: j for j, h in enumerate(new) if new_count[h] == 1}
+    candidates = [(i, new_position[h]) for i, h in enumerate(old) if old_count[h] == 1 and h in new_position]
+    # Longest increasing subsequence of the new positions
+    tails, tail_positions = [], []
+    previous = [-1] * len(candidates)
+    for n, (_, j) in enumerate(candidates):
+        k = bisect_left(tail_positions, j)
+        previous[n] = tails[k - 1] if k else -1
+        if k == len(tails):
+            tails.append(n)
+            tail_positions.append(j)
+        else:
+            tails[k] = n
+            tail_positions[k] = j
+    anchors = []
+    n = tails[-1] if tails else -1
+    while n >= 0:
+        anchors.append(candidates[n])
+        n = previous[n]
+    anchors.reverse()
+    return anchors
+
+
+def _opcodes(old, new, i1, i2, j1, j2):
+    """Return difflib opcodes aligning old[i1:i2] with new[j1:j2]."""
+    if max(i2 - i1, j2 - j1) <= LIST_ALIGN_LIMIT:
+        matcher = SequenceMatcher(None, old[i1:i2], new[j1:j2], autojunk=False)
+        return [(tag, a1 + i1, a2 + i1, b1 + j1, b2 + j1) for tag, a1, a2, b1, b2 in matcher.get_opcodes()]
+    opcodes = []
+    i, j = i1, j1
+    for anchor_i, anchor_j in _unique_anchors(old[i1:i2], new[j1:j2]) + [(i2 - i1, j2 - j1)]:
+        anchor_i += i1
+        anchor_j += j1
+        if anchor_i == i and anchor_j == j:
+            pass  # Consecutive anchors
+        elif max(anchor_i - i, anchor_j - j) <= LIST_ALIGN_LIMIT:
+            opcodes.extend(_opcodes(old, new, i, anchor_i, j, anchor_j))
+        else:
+            opcodes.append(('replace', i, anchor_i, j, anchor_j))
+        i, j = anchor_i + 1, anchor_j + 1
+    return opcodes
+
+
+def _align_lists(old_ids, new_ids, old_hashes, new_hashes):
+    """Yield ('pair', old, new), (REMOVED, old, None) or (ADDED, None, new) for two lists' children."""
+    old = [old_hashes[c] for c in old_ids]
+    new = [new_hashes[c] for c in new_ids]
+    # Unchanged heads and tails need no alignment
+    start = 0
+    shortest = min(len(old), len(new))
+    while start < shortest and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and old[-1 - end] == new[-1 - end]:
+        end += 1
+    for tag, i1, i2, j1, j2 in _opcodes(old, new, start, len(old) - end, start, len(new) - end):
+        if tag == 'equal':
+            continue
+        paired = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for n in range(paired):
+            yield 'pair', old_ids[i1 + n], new_ids[j1 + n]
+        for n in range(i1 + paired, i2):
+            yield REMOVED, old_ids[n], None
+        for n in range(j1 + paired, j2):
+            yield ADDED, None, new_ids[n]
+
+
+def diff_documents(old_index, old_hashes, new_index, new_hashes):
+    """Yield (change, old node id, new node id) for every difference between two documents.
+
+    ``change`` is ADDED (old id None), REMOVED (new id None) or CHANGED,
+    which covers scalars with a different value and nodes whose type
+    changed. Dict members are matched by key, list items by aligning
+    their hashes, so an inserted item is one ADDED change. Changes come
+    in document order.
+    """
+    # Work items: ('pair', old, new) to compare, or a change to report
+    stack = [('pair', 0, 0)]
+    while stack:
+        item = stack.pop()
+        if item[0] != 'pair':
+            yield item
+            continue
+        _, a, b = item
+        if old_hashes[a] == new_hashes[b]:
+            continue
+        old_kind = old_index.kind[a]
+        if old_kind != new_index.kind[b] or not old_index.is_container(a):
+            yield CHANGED, a, b
+            continue
+
+        if old_kind == DICT:
+            old_children = {old_index.key_of(c): c for c in old_index.child_ids(a)}
+            items = []
+            for c in new_index.child_ids(b):
+                old_child = old_children.pop(new_index.key_of(c), None)
+                items.append((ADDED, None, c) if old_child is None else ('pair', old_child, c))
+            items.extend((REMOVED, c, None) for c in old_children.values())
+        else:
+            items = list(_align_lists(old_index.child_ids(a), new_index.child_ids(b), old_hashes, new_hashes))
+        stack.extend(reversed(items))
@@ -0,0 +1,247 @@
+"""Per-rerun timing, widget counts and memory figures for the app's debug panel.
+
+Finished reruns are passed to every hook registered with ``add_export_hook``
+and logged as JSON on the ``json_explorer.perf`` logger at DEBUG level. When
+the ``JSON_EXPLORER_PERF_LOG`` environment variable names a file, each rerun
+is also appended to it as one JSON line.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+from .decoder import loads
+
+logger = logging.getLogger('json_explorer.perf')
+
+# Streamlit functions whose calls are counted as emitted elements
+COUNTED_ELEMENTS = frozenset({
+    'button', 'caption', 'checkbox', 'code', 'columns', 'dataframe', 'empty', 'error', 'expander',
+    'file_uploader', 'header', 'info', 'markdown', 'number_input', 'progress', 'radio', 'selectbox',
+    'spinner', 'subheader', 'tabs', 'text_area', 'text_input', 'title', 'warning', 'write',
+})
+
+_export_hooks = []
+
+# tracemalloc is process-wide while reruns trace per session: it runs while a live owner wants it,
+# and its peak is only reset while no traced rerun is in progress
+_tracing_lock = threading.Lock()
+_tracing_owners = weakref.WeakSet()
+_traced_reruns = weakref.WeakSet()
+_started_tracing = False
+
+
+def add_export_hook(hook):
+    """Call ``hook(record)`` with the dict of every finished rerun."""
+    if hook not in _export_hooks:
+        _export_hooks.append(hook)
+
+
+def remove_export_hook(hook):
+    if hook in _export_hooks:
+        _export_hooks.remove(hook)
+
+
+def has_export_hooks():
+    return bool(_export_hooks)
+
+
+class JsonlFileHook:
+    """Export hook appending each rerun record to a file as one JSON line."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __eq__(self, other):
+        return isinstance(other, JsonlFileHook) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __call__(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+
+if os.environ.get('JSON_EXPLORER_PERF_LOG'):
+    add_export_hook(JsonlFileHook(os.environ['JSON_EXPLORER_PERF_LOG']))
+
+
+def current_rss():
+    """Return the resident set size of this process in bytes, or None where it cannot be read."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def deep_sizeof(json_obj):
+    """Return the bytes taken by a decoded JSON value and everything it holds, counting shared objects once."""
+    seen = set()
+    total = 0
+    stack = [json_obj]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        total += sys.getsizeof(value)
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return total
+
+
+def jsonl_memory(line_index, sample_size=200):
+    """Return the memory a LineIndex takes and an estimate of what decoding every record would take.
+
+    The estimate scales the decoded size of up to ``sample_size`` evenly
+    spaced records by their share of the raw bytes. Returns a dict with
+    ``buffer_bytes`` (the raw lines, memory-mapped for files), ``index_bytes``
+    (the offset arrays), ``decoded_bytes`` (the estimate, or None if no
+    sampled record decodes) and ``mapped``.
+    """
+    count = len(line_index)
+    step = max(1, count // sample_size)
+    sampled_raw = sampled_decoded = 0
+    for i in range(0, count, step):
+        raw = line_index.raw(i)
+        try:
+            sampled_decoded += deep_sizeof(loads(raw))
+        except ValueError:
+            continue
+        sampled_raw += len(raw)
+    return {
+        'buffer_bytes': line_index.size,
+        'index_bytes': line_index.index_size,
+        'decoded_bytes': round(sampled_decoded * line_index.size / sampled_raw) if sampled_raw else None,
+        'mapped': line_index.path is not None,
+    }
+
+
+class WidgetCounter:
+    """Stand-in for the streamlit module that counts the elements created through it.
+
+    Every attribute is passed through; calls to the functions in
+    ``COUNTED_ELEMENTS`` are tallied in ``counts`` first. ``columns`` counts
+    the columns it creates.
+    """
+
+    def __init__(self, module, counts):
+        self._module = module
+        self._counts = counts
+
+    def __getattr__(self, name):
+        attr = getattr(self._module, name)
+        if name not in COUNTED_ELEMENTS:
+            return attr
+        counts = self._counts
+
+        def counted(*args, **kwargs):
+            spec = args[0] if args else kwargs.get('spec', 1)
+            counts[name] += (spec if isinstance(spec, int) else len(spec)) if name == 'columns' else 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+class TracingOwner:
+    """A session's hold on allocation tracing; keep one per session and pass it to every RerunProfile."""
+
+    __slots__ = ('__weakref__',)
+
+
+class RerunProfile:
+    """Figures for one rerun of the app.
+
+    Wrap each part of the script in ``stage(name)``; a stage entered again
+    in the same rerun accumulates. With ``trace_allocations``, tracemalloc
+    is kept running and the net Python allocations of the rerun and of each
+    stage are recorded as well. Call ``finish`` once at the end of the script.
+
+    Tracing is shared by every session of the process. It starts with the
+    first ``owner`` that asks for it and stops once no live owner does, so
+    a session turning it off never stops another's measurement. Reruns of
+    other sessions running at the same time add to the figures.
+    """
+
+    def __init__(self, trace_allocations=False, owner=None):
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.stage_allocations = {}
+        self.widgets = Counter()
+        self.trace_allocations = trace_allocations
+        self._set_tracing(self if owner is None else owner)
+        self._rss_start = current_rss()
+        self.record = None
+
+    def _set_tracing(self, owner):
+        global _started_tracing
+        with _tracing_lock:
+            if self.trace_allocations:
+                _tracing_owners.add(owner)
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    _started_tracing = True
+                if not _traced_reruns:
+                    tracemalloc.reset_peak()
+                _traced_reruns.add(self)
+                self._alloc_start = tracemalloc.get_traced_memory()[0]
+                return
+            _tracing_owners.discard(owner)
+            # Tracing started some other way, e.g. with python -X tracemalloc, is left alone
+            if not _tracing_owners and _started_tracing and tracemalloc.is_tracing():
+                tracemalloc.stop()
+                _started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        alloc_start = tracemalloc.get_traced_memory()[0] if self.trace_allocations else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if self.trace_allocations:
+                delta = tracemalloc.get_traced_memory()[0] - alloc_start
+                self.stage_allocations[name] = self.stage_allocations.get(name, 0) + delta
+
+    def finish(self):
+        """Build this rerun's record and pass it to the export hooks."""
+        rss = current_rss()
+        record = {
+            'timestamp': self.started,
+            'total_seconds': time.perf_counter() - self._start,
+            'stages': dict(self.stages),
+            'widgets': dict(self.widgets),
+            'widget_total': sum(self.widgets.values()),
+            'rss_bytes': rss,
+            'rss_delta_bytes': None if rss is None or self._rss_start is None else rss - self._rss_start,
+        }
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            record['alloc_delta_bytes'] = current - self._alloc_start
+            record['alloc_peak_bytes'] = peak - self._alloc_start
+            record['stage_alloc_bytes'] = dict(self.stage_allocations)
+            with _tracing_lock:
+                _traced_reruns.discard(self)
+        self.record = record
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(record))
+        for hook in list(_export_hooks):
+            try:
+                hook(record)
+            except Exception:
+                logger.exception("Performance export hook %r failed", hook)
+        return record
@@ -0,0 +1,261 @@
+import re
+
+from .decoder import loads
+from .paths import format_path_segment, iter_leaves, iter_nodes
+from .record_search import match_record, raw_prefilter
+
+# Containers this deep are kept as byte spans; the root is depth 0
+DEFAULT_SCAN_DEPTH = 2
+# Raw bytes of subtrees a SubtreeSearch decodes between two progress updates
+SEARCH_BATCH_BYTES = 8 * 1024 * 1024
+
+# Containers nested up to this deep are skipped by a single regex match
+_SKIP_NESTING = 6
+
+# Patterns are written as unrolled loops, where every run of plain bytes is followed by a
+# string or bracket, so that a failed match backtracks in linear time without possessive quantifiers
+_STRING_PATTERN = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_PLAIN_PATTERN = rb'[^"\[\]{}]*'
+_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_STRING = re.compile(_STRING_PATTERN, re.S)
+_LITERAL = re.compile(rb'[^ \t\r\n,:\[\]{}"]+')
+# The next bracket outside a string, with everything before it consumed
+_NEXT_BRACKET = re.compile(_PLAIN_PATTERN + rb'(?:' + _STRING_PATTERN + _PLAIN_PATTERN + rb')*(?:([\[{])|([\]}]))',
+                           re.S)
+
+
+def _container_pattern(nesting):
+    pattern = rb'[\[{]' + _PLAIN_PATTERN + rb'(?:' + _STRING_PATTERN + _PLAIN_PATTERN + rb')*[\]}]'
+    for _ in range(nesting - 1):
+        pattern = (rb'[\[{]' + _PLAIN_PATTERN + rb'(?:(?:' + _STRING_PATTERN + rb'|' + pattern + rb')'
+                   + _PLAIN_PATTERN + rb')*[\]}]')
+    return re.compile(pattern, re.S)
+
+
+_CONTAINER = _container_pattern(_SKIP_NESTING)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class LazyValue:
+    """Placeholder for a dict or list that has not been decoded.
+
+    Holds the byte span of the container in the document buffer and the
+    keys leading to it from the root.
+    """
+
+    __slots__ = ('start', 'end', 'is_dict', 'keys')
+
+    def __init__(self, start, end, is_dict, keys):
+        self.start = start
+        self.end = end
+        self.is_dict = is_dict
+        self.keys = keys
+
+    @property
+    def size(self):
+        return self.end - self.start
+
+    def path(self, root_path="data"):
+        return root_path + ''.join(format_path_segment(k) for k in self.keys)
+
+    def __str__(self):
+        return f"{'{...}' if self.is_dict else '[...]'} {format_size(self.size)} not loaded"
+
+
+class LazyDocument:
+    """A single JSON document whose deeper subtrees are decoded on demand.
+
+    The buffer (usually a memory-mapped file) is scanned once. Containers
+    shallower than ``scan_depth`` are built as ordinary dicts and lists,
+    with their scalars decoded, and every container at ``scan_depth`` is
+    replaced by a LazyValue recording its byte span. The result is the
+    ``root`` skeleton. Only brackets and strings are looked at inside a
+    skipped span, so a malformed subtree is reported when it is decoded.
+    """
+
+    def __init__(self, buffer, scan_depth=DEFAULT_SCAN_DEPTH):
+        self.buffer = buffer
+        self.scan_depth = scan_depth
+        # Every LazyValue in the skeleton, in document order
+        self.lazy_values = []
+        self.lazy_bytes = 0
+        self.root, end = self._scan_value(self._skip_whitespace(0), 0, ())
+        end = self._skip_whitespace(end)
+        if end != len(buffer):
+            raise ValueError(f"Extra data at byte {end}")
+
+    @property
+    def skeleton_size(self):
+        """Bytes of the input that were decoded into the skeleton."""
+        return len(self.buffer) - self.lazy_bytes
+
+    def _skip_whitespace(self, pos):
+        return _WHITESPACE.match(self.buffer, pos).end()
+
+    def _scan_value(self, pos, depth, keys):
+        buffer = self.buffer
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of data")
+        first = buffer[pos:pos + 1]
+        if first in (b'{', b'['):
+            # Empty containers are decoded in place; they have no subtree to defer
+            inner = self._skip_whitespace(pos + 1)
+            if depth >= self.scan_depth and buffer[inner:inner + 1] not in (b'}', b']'):
+                end = self._skip_container(pos)
+                value = LazyValue(pos, end, first == b'{', keys)
+                self.lazy_values.append(value)
+                self.lazy_bytes += end - pos
+                return value, end
+            if first == b'{':
+                return self._scan_dict(pos, depth, keys)
+            return self._scan_list(pos, depth, keys)
+        match = (_STRING if first == b'"' else _LITERAL).match(buffer, pos)
+        if match is None:
+            raise ValueError(f"Unexpected {first!r} at byte {pos}")
+        return loads(match.group()), match.end()
+
+    def _scan_dict(self, pos, depth, keys):
+        buffer = self.buffer
+        obj = {}
+        pos = self._skip_whitespace(pos + 1)
+        if buffer[pos:pos + 1] == b'}':
+            return obj, pos + 1
+        while True:
+            match = _STRING.match(buffer, pos)
+            if match is None:
+                raise ValueError(f"Expected a key at byte {pos}")
+            key = loads(match.group())
+            pos = self._skip_whitespace(match.end())
+            if buffer[pos:pos + 1] != b':':
+                raise ValueError(f"Expected ':' at byte {pos}")
+            obj[key], pos = self._scan_value(self._skip_whitespace(pos + 1), depth + 1, keys + (key,))
+            pos = self._skip_whitespace(pos)
+            separator = buffer[pos:pos + 1]
+            if separator == b'}':
+                return obj, pos + 1
+            if separator != b',':
+                raise ValueError(f"Expected ',' or '}}' at byte {pos}")
+            pos = self._skip_whitespace(pos + 1)
+
+    def _scan_list(self, pos, depth, keys):
+        buffer = self.buffer
+        items = []
+        pos = self._skip_whitespace(pos + 1)
+        if buffer[pos:pos + 1] == b']':
+            return items, pos + 1
+        while True:
+            item, pos = self._scan_value(pos, depth + 1, keys + (len(items),))
+            items.append(item)
+            pos = self._skip_whitespace(pos)
+            separator = buffer[pos:pos + 1]
+            if separator == b']':
+                return items, pos + 1
+            if separator != b',':
+                raise ValueError(f"Expected ',' or ']' at byte {pos}")
+            pos = self._skip_whitespace(pos + 1)
+
+    def _skip_container(self, pos):
+        """Return the offset just past the container starting at ``pos``."""
+        match = _CONTAINER.match(self.buffer, pos)
+        if match is not None:
+            return match.end()
+        # Deeper than _SKIP_NESTING: count brackets, still skipping shallower containers in one match
+        buffer = self.buffer
+        start = pos
+        depth = 0
+        while True:
+            match = _NEXT_BRACKET.match(buffer, pos)
+            if match is None:
+                raise ValueError(f"Unterminated container starting at byte {start}")
+            pos = match.end()
+            if match.lastindex == 2:
+                depth -= 1
+                if depth == 0:
+                    return pos
+                continue
+            nested = _CONTAINER.match(buffer, pos - 1) if depth else None
+            if nested is not None:
+                pos = nested.end()
+            else:
+                depth += 1
+
+    def decode(self, lazy_value):
+        """Decode the subtree behind ``lazy_value``; the result is not kept."""
+        return loads(self.buffer[lazy_value.start:lazy_value.end])
+
+    def iter_leaves(self, collapse_arrays=False):
+        """Like paths.iter_leaves over the whole document, decoding one subtree at a time."""
+        for path, key, value in iter_leaves(self.root, collapse_arrays=collapse_arrays):
+            if isinstance(value, LazyValue):
+                yield from iter_leaves(self.decode(value), path, collapse_arrays)
+            else:
+                yield path, key, value
+
+    def iter_nodes(self, collapse_arrays=False):
+        """Like paths.iter_nodes over the whole document, decoding one subtree at a time."""
+        for path, key, value in iter_nodes(self.root, collapse_arrays=collapse_arrays):
+            if isinstance(value, LazyValue):
+                yield from iter_nodes(self.decode(value), path, collapse_arrays, key)
+            else:
+                yield path, key, value
+
+
+class SubtreeSearch:
+    """Run a Path Finder query inside every undecoded subtree of a LazyDocument.
+
+    Subtrees are decoded one at a time and dropped after they are searched,
+    skipping those whose raw bytes cannot contain a match. Iterating yields
+    a list of (path, preview) matches after roughly every
+    ``SEARCH_BATCH_BYTES`` of input; ``subtrees_done`` and ``bytes_done``
+    track progress.
+    """
+
+    def __init__(self, lazy_document, query, mode='keys', limit=1000, loaded=None):
+        self.lazy_document = lazy_document
+        self.query = query.lower()
+        self.mode = mode
+        self.limit = limit
+        # Optional lookup of already decoded subtrees by LazyValue, to skip decoding them again
+        self.loaded = loaded
+        self.subtrees_total = len(lazy_document.lazy_values)
+        self.bytes_total = lazy_document.lazy_bytes
+        self.subtrees_done = 0
+        self.bytes_done = 0
+        self.match_count = 0
+        self.stopped_early = False
+
+    def __iter__(self):
+        buffer = self.lazy_document.buffer
+        batch = []
+        batch_bytes = 0
+        # Value matches do not depend on the path, so one prefilter serves every subtree
+        prefilter = raw_prefilter(self.query, self.mode) if self.mode == 'values' else None
+        for lazy_value in self.lazy_document.lazy_values:
+            root_path = lazy_value.path()
+            if self.mode == 'keys':
+                prefilter = raw_prefilter(self.query, self.mode, root_path)
+            if prefilter is None or prefilter.search(buffer, lazy_value.start, lazy_value.end):
+                json_obj = self.loaded(lazy_value) if self.loaded else None
+                if json_obj is None:
+                    json_obj = self.lazy_document.decode(lazy_value)
+                matches = match_record(json_obj, self.query, self.mode, self.limit - self.match_count, root_path)
+                batch.extend(matches)
+                self.match_count += len(matches)
+            self.subtrees_done += 1
+            self.bytes_done += lazy_value.size
+            batch_bytes += lazy_value.size
+            if self.match_count >= self.limit:
+                self.stopped_early = self.subtrees_done < self.subtrees_total
+                break
+            if batch_bytes >= SEARCH_BATCH_BYTES:
+                yield batch
+                batch = []
+                batch_bytes = 0
+        yield batch
@@ -0,0 +1,90 @@
+"""Decode every record of a LineIndex in the background, collecting the lines that are not JSON."""
+import json
+import os
+import threading
+
+from .decoder import loads
+from .record_search import RECORDS_PER_CHUNK, chunk_tasks, map_chunks, read_chunk
+
+# Bad lines whose details are kept; further ones are only counted
+MAX_BAD_LINE_DETAILS = 1000
+
+
+def _check_chunk(source, base, starts, ends, first_record):
+    """Decode one chunk of records; runs in a worker process.
+
+    Returns (records, bad lines), each bad line as (record index, error
+    message, column, byte offset of the error in the input).
+    """
+    chunk = read_chunk(source, base, ends)
+    bad = []
+    for n in range(len(starts)):
+        raw = chunk[starts[n] - base:ends[n] - base]
+        try:
+            loads(raw)
+        except UnicodeDecodeError as e:
+            bad.append((first_record + n, f"Invalid UTF-8: {e.reason}", e.start + 1, starts[n] + e.start))
+        except json.JSONDecodeError as e:
+            # e.pos counts characters; the offset into the file counts bytes
+            offset = len(raw.decode('utf-8', 'replace')[:e.pos].encode('utf-8'))
+            bad.append((first_record + n, e.msg, e.colno, starts[n] + offset))
+    return len(starts), bad
+
+
+class LineCheck:
+    """Decode every record of a LineIndex on a background thread.
+
+    Chunks are decoded in a process pool as in RecordSearch. While the
+    check runs, ``records_done`` and ``bad_count`` grow and ``bad_lines``
+    collects (record index, line number, message, column, offset) for up
+    to MAX_BAD_LINE_DETAILS bad lines, sorted by record once ``done``.
+    ``error`` holds the exception that stopped the check, if any.
+    """
+
+    def __init__(self, line_index, workers=None, records_per_chunk=RECORDS_PER_CHUNK):
+        self.line_index = line_index
+        self.workers = workers or os.cpu_count() or 1
+        self.records_per_chunk = records_per_chunk
+        self.chunks_total = -(-len(line_index) // records_per_chunk)
+        self.records_done = 0
+        self.bad_count = 0
+        self.bad_lines = []
+        self.done = False
+        self.error = None
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='json-explorer-line-check', daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    def _run(self):
+        line_index = self.line_index
+        tasks = chunk_tasks(line_index, self.records_per_chunk)
+        results = map_chunks(_check_chunk, tasks, self.workers, self.chunks_total)
+        try:
+            for records, bad in results:
+                for record, message, column, offset in bad:
+                    if len(self.bad_lines) < MAX_BAD_LINE_DETAILS:
+                        self.bad_lines.append((record, line_index.line_number(record), message, column, offset))
+                self.bad_count += len(bad)
+                self.records_done += records
+                if self._cancelled.is_set():
+                    return
+        except Exception as e:
+            self.error = e
+        finally:
+            results.close()
+            # Chunks finish out of order; rebinding keeps readers on other threads from seeing a list mid-sort
+            self.bad_lines = sorted(self.bad_lines)
+            self.done = True
@@ -0,0 +1,103 @@
+import mmap
+import os
+from array import array
+
+from .decoder import loads
+
+_WHITESPACE = frozenset(b" \t\r\n\f\v")
+
+
+def map_file(path):
+    """Return a read-only memory map of a file, or empty bytes for an empty file."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class LineIndex:
+    """Byte-offset index over the non-blank lines of a JSON Lines buffer.
+
+    The buffer is scanned once for newlines; no line is decoded until it is
+    requested through ``record``.
+    """
+
+    def __init__(self, buffer, source=None, path=None):
+        self.buffer = buffer
+        self.source = source
+        # Set when the buffer maps a file, so other processes can read it themselves
+        self.path = path
+        self._starts = array('q')
+        self._ends = array('q')
+        self._line_numbers = array('q')
+        self._build()
+
+    @classmethod
+    def from_bytes(cls, data, source=None):
+        return cls(data, source=source)
+
+    @classmethod
+    def from_text(cls, text, source=None):
+        return cls(text.encode('utf-8'), source=source)
+
+    @classmethod
+    def from_path(cls, path):
+        """Memory-map a file on disk and index its lines."""
+        return cls(map_file(path), source=path, path=path)
+
+    def _build(self):
+        buffer = self.buffer
+        size = len(buffer)
+        find = buffer.find
+        starts, ends, line_numbers = self._starts, self._ends, self._line_numbers
+        start = 0
+        line_number = 1
+        while start < size:
+            end = find(b'\n', start)
+            if end == -1:
+                end = size
+            # Most JSONL lines start with '{' or '[', so only lines that begin
+            # with whitespace need to be copied out and checked for blankness.
+            if end > start and (buffer[start] not in _WHITESPACE
+                                or buffer[start:end].strip()):
+                starts.append(start)
+                ends.append(end)
+                line_numbers.append(line_number)
+            start = end + 1
+            line_number += 1
+
+    def __len__(self):
+        return len(self._starts)
+
+    @property
+    def size(self):
+        return len(self.buffer)
+
+    @property
+    def index_size(self):
+        """Bytes taken by the offset arrays."""
+        return sum(a.itemsize * len(a) for a in (self._starts, self._ends, self._line_numbers))
+
+    def line_number(self, i):
+        """Return the 1-based line number of record ``i`` in the source."""
+        return self._line_numbers[i]
+
+    def span(self, i):
+        return self._starts[i], self._ends[i]
+
+    def spans(self, first, stop):
+        """Return the start and end offsets of records ``first`` to ``stop - 1`` as two arrays."""
+        return self._starts[first:stop], self._ends[first:stop]
+
+    def raw(self, i):
+        """Return the undecoded bytes of record ``i``."""
+        return self.buffer[self._starts[i]:self._ends[i]]
+
+    def record(self, i):
+        """Decode and return record ``i``."""
+        return loads(self.raw(i))
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
@@ -0,0 +1,162 @@
+from array import array
+from bisect import bisect_left
+
+from .paths import format_path_segment, format_value_preview
+
+# Type tags stored in NodeIndex.kind
+DICT, LIST, STR, INT, FLOAT, BOOL, NULL, OTHER = range(8)
+
+_KINDS = {dict: DICT, list: LIST, str: STR, int: INT, float: FLOAT, bool: BOOL, type(None): NULL}
+KIND_NAMES = ('dict', 'list', 'str', 'int', 'float', 'bool', 'null', 'other')
+# Kinds whose values the Path Finder value search looks at
+SEARCHABLE_KINDS = (STR, INT, FLOAT, BOOL)
+
+
+def kind_of(value):
+    """Return the type tag NodeIndex.kind would store for ``value``."""
+    return _KINDS.get(type(value), OTHER)
+
+
+class NodeIndex:
+    """Array-backed table of every node of a parsed JSON document.
+
+    Nodes are numbered in document (pre-)order, so the descendants of node
+    ``i`` are exactly the ids in ``range(i + 1, end[i])``. For every node the
+    table stores its parent id, its key (an id into ``keys`` for dict members,
+    the position for list items), a type tag and a reference to its value.
+    Children of a container are listed contiguously in ``children`` starting
+    at ``child_start[i]``, which makes slicing a page of children O(1).
+
+    Path strings and previews are not stored; ``path`` and ``preview`` render
+    them on demand for the rows that are actually shown.
+    """
+
+    def __init__(self, root):
+        self.parent = array('i')
+        self.kind = array('b')
+        self.key = array('i')
+        self.child_start = array('i')
+        self.children = array('i')
+        self.end = array('i')
+        self.depth = array('i')
+        # Non-empty dicts and lists, in document order
+        self.containers = array('i')
+        # Rows of the Path Finder: scalars and empty containers, in document order
+        self.leaves = array('i')
+        self.values = []
+        self.keys = []
+        self._key_ids = {}
+        self._build(root)
+
+    def _build(self, root):
+        children, end, values, key_ids, keys = self.children, self.end, self.values, self._key_ids, self.keys
+        add_parent, add_kind, add_key = self.parent.append, self.kind.append, self.key.append
+        add_child_start, add_end = self.child_start.append, end.append
+        depth = self.depth
+        add_depth, add_container = depth.append, self.containers.append
+        add_leaf, add_value = self.leaves.append, values.append
+        kinds = _KINDS
+
+        # Containers whose children are still being numbered, as
+        # (node id, is dict, iterator over enumerate(children), first slot)
+        stack = []
+
+        def add_node(value, parent_id, node_key):
+            """Number one node; return True if it is a non-empty container to descend into"""
+            node_id = len(values)
+            node_kind = kinds.get(type(value), OTHER)
+            add_parent(parent_id)
+            add_kind(node_kind)
+            add_key(node_key)
+            add_value(value)
+            add_depth(depth[parent_id] + 1 if parent_id >= 0 else 0)
+            if node_kind <= LIST:
+                first_slot = len(children)
+                add_child_start(first_slot)
+                if value:
+                    add_container(node_id)
+                    children.frombytes(bytes(4 * len(value)))
+                    add_end(0)  # Filled in once all descendants are numbered
+                    is_dict = node_kind == DICT
+                    stack.append((node_id, is_dict, enumerate(value.items() if is_dict else value), first_slot))
+                    return True
+            else:
+                add_child_start(-1)
+            add_end(node_id + 1)
+            add_leaf(node_id)
+            return False
+
+        add_node(root, -1, 0)
+        while stack:
+            node_id, is_dict, items, first_slot = stack[-1]
+            for n, item in items:
+                if is_dict:
+                    k, item = item
+                    node_key = key_ids.get(k)
+                    if node_key is None:
+                        node_key = key_ids[k] = len(keys)
+                        keys.append(k)
+                else:
+                    node_key = n
+                children[first_slot + n] = len(values)
+                if add_node(item, node_id, node_key):
+                    break  # Number the new container's subtree before its next sibling
+            else:
+                stack.pop()
+                end[node_id] = len(values)
+
+    def __len__(self):
+        return len(self.kind)
+
+    def is_container(self, i):
+        return self.child_start[i] >= 0
+
+    def child_count(self, i):
+        return len(self.values[i]) if self.child_start[i] >= 0 else 0
+
+    def child_ids(self, i, start=0, stop=None):
+        """Return the ids of the children of node ``i``, optionally a slice of them."""
+        if self.child_start[i] < 0:
+            return array('i')
+        count = len(self.values[i])
+        stop = count if stop is None else min(stop, count)
+        first = self.child_start[i]
+        return self.children[first + start:first + stop]
+
+    def subtree_containers(self, i):
+        """Return the non-empty containers in the subtree of node ``i``, including ``i``."""
+        containers = self.containers
+        return containers[bisect_left(containers, i):bisect_left(containers, self.end[i])]
+
+    def containers_to_depth(self, max_depth):
+        """Return the non-empty containers shallower than ``max_depth``."""
+        depth = self.depth
+        return array('i', (i for i in self.containers if depth[i] < max_depth))
+
+    def key_of(self, i):
+        """Return the dict key or list index of node ``i`` (None for the root)."""
+        parent_id = self.parent[i]
+        if parent_id < 0:
+            return None
+        if self.kind[parent_id] == DICT:
+            return self.keys[self.key[i]]
+        return self.key[i]
+
+    def key_chain(self, i):
+        """Return the keys leading from the root to node ``i``."""
+        chain = []
+        while self.parent[i] >= 0:
+            chain.append(self.key_of(i))
+            i = self.parent[i]
+        chain.reverse()
+        return chain
+
+    def path(self, i, root_path="data"):
+        """Render the Python access path of node ``i``, e.g. data['a'][3]."""
+        return root_path + ''.join(format_path_segment(k) for k in self.key_chain(i))
+
+    def preview(self, i):
+        value = self.values[i]
+        if self.child_start[i] >= 0 and not value:
+            return "{}" if self.kind[i] == DICT else "[]"
+        return format_value_preview(value)
@@ -0,0 +1,43 @@
+from .decoder import JSONL, detect_format, loads
+from .lazy import LazyDocument
+from .line_index import LineIndex, map_file
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+# Single JSON files at least this large are opened lazily, decoding subtrees only when they are explored.
+# Scanning the skeleton in Python takes about 1.5 to 7 times as long as json.loads, the more so the more
+# small containers the top levels hold, but peaks at a fraction of the memory; below this size speed wins.
+LAZY_DOCUMENT_MIN_BYTES = 64 * 1024 * 1024
+
+
+def parse_text(text):
+    """Parse text as one JSON document, or index it when its first lines look like JSONL.
+
+    Returns the decoded object or a LineIndex, whose malformed lines are
+    left for the caller to report. Raises the document's JSONDecodeError if
+    the text is neither.
+    """
+    data = text.encode('utf-8')
+    if detect_format(data) == JSONL:
+        return LineIndex.from_bytes(data)
+    # Errors still report positions in characters: json decodes bytes to text before parsing
+    return loads(data)
+
+
+def parse_buffer(buffer, name, path=None, lazy_min_bytes=LAZY_DOCUMENT_MIN_BYTES):
+    """Index a JSONL input by its lines; decode anything else as a single document.
+
+    ``buffer`` holds the bytes of the input called ``name``, or maps the
+    file at ``path``. Returns a LineIndex for JSONL, a LazyDocument for
+    single documents of at least ``lazy_min_bytes``, or the decoded object.
+    """
+    if name.lower().endswith(JSONL_EXTENSIONS) or detect_format(buffer) == JSONL:
+        return LineIndex(buffer, source=name, path=path)
+    if len(buffer) >= lazy_min_bytes:
+        # Decode only the top levels now; deeper subtrees are decoded when they are explored
+        return LazyDocument(buffer)
+    return loads(buffer[:])
+
+
+def parse_path(path, lazy_min_bytes=LAZY_DOCUMENT_MIN_BYTES):
+    """Memory-map a file on disk and parse it like ``parse_buffer``."""
+    return parse_buffer(map_file(path), path, path=path, lazy_min_bytes=lazy_min_bytes)
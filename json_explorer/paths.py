@@ -0,0 +1,90 @@
+# Function to format value previews based on type
+def format_value_preview(value, max_length=30):
+    if isinstance(value, str):
+        return f'"{value[:max_length]}{"..." if len(value) > max_length else ""}"'
+    elif isinstance(value, (dict, list)):
+        return f"{type(value).__name__} with {len(value)} items"
+    else:
+        return str(value)
+
+
+# Function to format one step of a Python access path
+def format_path_segment(key):
+    """Return ['key'] for dict keys and [i] for list indexes, quoting keys as Python literals"""
+    return f"[{key}]" if isinstance(key, int) else f"[{key!r}]"
+
+
+# Function to iterate over the leaves of a JSON object
+def iter_leaves(json_obj, current_path="data", collapse_arrays=False):
+    """Yield (path, key, value) for every scalar and empty container in document order.
+
+    With collapse_arrays, list indexes are written as [*] so that the same
+    field of every array item shares one path.
+    """
+    if isinstance(json_obj, dict):
+        if not json_obj:  # Handle empty dict
+            yield (current_path, None, json_obj)
+            return
+
+        for key, value in json_obj.items():
+            new_path = current_path + format_path_segment(key)
+            if isinstance(value, (dict, list)) and value:
+                yield from iter_leaves(value, new_path, collapse_arrays)
+            else:
+                yield (new_path, key, value)
+    elif isinstance(json_obj, list):
+        if not json_obj:  # Handle empty list
+            yield (current_path, None, json_obj)
+            return
+
+        for i, item in enumerate(json_obj):
+            new_path = current_path + "[*]" if collapse_arrays else f"{current_path}[{i}]"
+            if isinstance(item, (dict, list)) and item:
+                yield from iter_leaves(item, new_path, collapse_arrays)
+            else:
+                yield (new_path, i, item)
+    else:
+        # This handles the case where the root is a primitive
+        yield (current_path, None, json_obj)
+
+
+def iter_nodes(json_obj, current_path="data", collapse_arrays=False, key=None):
+    """Yield (path, key, value) for every value in document order, each container before its contents.
+
+    Unlike iter_leaves, non-empty dicts and lists are yielded too, so that
+    their sizes can be looked at. ``key`` is yielded with ``json_obj`` itself.
+    """
+    yield current_path, key, json_obj
+    if isinstance(json_obj, dict):
+        for k, value in json_obj.items():
+            new_path = current_path + format_path_segment(k)
+            if isinstance(value, (dict, list)):
+                yield from iter_nodes(value, new_path, collapse_arrays, k)
+            else:
+                yield new_path, k, value
+    elif isinstance(json_obj, list):
+        for i, item in enumerate(json_obj):
+            new_path = current_path + "[*]" if collapse_arrays else f"{current_path}[{i}]"
+            if isinstance(item, (dict, list)):
+                yield from iter_nodes(item, new_path, collapse_arrays, i)
+            else:
+                yield new_path, i, item
+
+
+# Function to iterate over all leaf paths of a JSON object
+def iter_paths(json_obj, current_path="data"):
+    """Yield (path, preview, key, value) for every leaf in document order.
+
+    Empty containers are leaves too and yield (path, "{}") or (path, "[]").
+    """
+    for path, key, value in iter_leaves(json_obj, current_path):
+        if isinstance(value, (dict, list)):
+            yield (path, "{}" if isinstance(value, dict) else "[]")
+        else:
+            yield (path, format_value_preview(value), key, value)
+
+
+# Function to extract paths from JSON
+def extract_paths(json_obj, current_path="data"):
+    """Extract all possible paths from JSON object"""
+    return list(iter_paths(json_obj, current_path))
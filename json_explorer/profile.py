@@ -0,0 +1,125 @@
+from .paths import iter_nodes
+
+# Most distinct paths a profile tracks; occurrences of further paths are only counted
+DEFAULT_MAX_PATHS = 5000
+
+_TYPE_NAMES = {dict: 'dict', list: 'list', str: 'str', int: 'int', float: 'float', bool: 'bool', type(None): 'null'}
+
+
+class PathStats:
+    """Running statistics for one collapsed path."""
+
+    __slots__ = ('count', 'records', 'types', 'min', 'max', 'min_length', 'max_length')
+
+    def __init__(self):
+        self.count = 0
+        self.records = 0
+        self.types = {}
+        self.min = None
+        self.max = None
+        self.min_length = None
+        self.max_length = None
+
+    def add(self, value):
+        self.count += 1
+        type_name = _TYPE_NAMES.get(type(value), type(value).__name__)
+        self.types[type_name] = self.types.get(type_name, 0) + 1
+        if type_name in ('int', 'float'):
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+        elif type_name in ('str', 'dict', 'list'):
+            length = len(value)
+            if self.min_length is None or length < self.min_length:
+                self.min_length = length
+            if self.max_length is None or length > self.max_length:
+                self.max_length = length
+
+    def merge(self, other):
+        self.count += other.count
+        self.records += other.records
+        for type_name, count in other.types.items():
+            self.types[type_name] = self.types.get(type_name, 0) + count
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        if other.min_length is not None and (self.min_length is None or other.min_length < self.min_length):
+            self.min_length = other.min_length
+        if other.max_length is not None and (self.max_length is None or other.max_length > self.max_length):
+            self.max_length = other.max_length
+
+    @property
+    def null_rate(self):
+        return self.types.get('null', 0) / self.count if self.count else 0.0
+
+
+class SchemaProfile:
+    """Streaming schema and key-frequency profile of JSON records.
+
+    Records are fed one at a time through ``add`` and are not kept. Every
+    value is profiled, dicts and lists included so that their lengths are
+    known. Paths are collapsed so that every array item shares one ``[*]``
+    path, and each path keeps constant-size statistics. At most
+    ``max_paths`` distinct paths are tracked; values under further paths are
+    counted in ``untracked``.
+    """
+
+    def __init__(self, max_paths=DEFAULT_MAX_PATHS):
+        self.max_paths = max_paths
+        self.paths = {}
+        self.records = 0
+        self.untracked = 0
+
+    def add(self, json_obj):
+        self.add_nodes(iter_nodes(json_obj, collapse_arrays=True))
+
+    def add_nodes(self, nodes):
+        """Add one record given as its (path, key, value) nodes with collapsed paths."""
+        self.records += 1
+        paths = self.paths
+        seen = set()
+        for path, _, value in nodes:
+            stats = paths.get(path)
+            if stats is None:
+                if len(paths) >= self.max_paths:
+                    self.untracked += 1
+                    continue
+                stats = paths[path] = PathStats()
+            stats.add(value)
+            if path not in seen:
+                seen.add(path)
+                stats.records += 1
+
+    def merge(self, other):
+        """Fold in a profile built over other records, e.g. by another worker."""
+        self.records += other.records
+        self.untracked += other.untracked
+        for path, other_stats in other.paths.items():
+            stats = self.paths.get(path)
+            if stats is None:
+                if len(self.paths) >= self.max_paths:
+                    self.untracked += other_stats.count
+                    continue
+                stats = self.paths[path] = PathStats()
+            stats.merge(other_stats)
+
+    def rows(self):
+        """Return one dict per path for display, most common paths first."""
+        rows = []
+        for path, stats in sorted(self.paths.items(), key=lambda item: (-item[1].records, item[0])):
+            rows.append({
+                'Path': path,
+                'Records': stats.records,
+                'Coverage': f"{stats.records / self.records:.1%}" if self.records else "",
+                'Occurrences': stats.count,
+                'Types': ", ".join(f"{name} {count / stats.count:.0%}"
+                                   for name, count in sorted(stats.types.items(), key=lambda t: -t[1])),
+                'Null rate': f"{stats.null_rate:.1%}",
+                'Min': None if stats.min is None else str(stats.min),
+                'Max': None if stats.max is None else str(stats.max),
+                'Min length': stats.min_length,
+                'Max length': stats.max_length,
+            })
+        return rows
@@ -0,0 +1,521 @@
+"""Path queries with wildcards, recursive descent and simple predicates.
+
+A query is written like the accessors the app generates, with a few
+additions::
+
+    data['items'][*]['id']          every item's id
+    data..['id']                    every 'id' key at any depth
+    data['items'][?(@['price'] > 10)]['name']
+    data['rows'][0:10]              a slice of a list
+    data.meta.version               .name is short for ['name']
+
+The leading ``data`` may be left out: ``items[*].id`` is read as
+``data.items[*].id``, and ``[0]`` as ``data[0]``. ``compile_query`` parses a query
+once into a PathQuery whose plan is a chain of step functions; compiled
+queries are cached by their text.
+"""
+import ast
+import json
+import re
+from functools import lru_cache
+
+from .decoder import loads
+from .paths import format_path_segment, format_value_preview
+
+# Records decoded between two progress updates of a RecordQuery
+RECORDS_PER_BATCH = 5000
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_STRING = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*\"""")
+_INDEX_OR_SLICE = re.compile(r"(-?\d+)?\s*(?:(:)\s*(-?\d+)?)?")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_OPERATOR = re.compile(r"==|!=|<=|>=|<|>")
+_WORD_LITERALS = {'true': True, 'false': False, 'null': None, 'True': True, 'False': False, 'None': None}
+_COMPARISONS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+_MISSING = object()
+
+
+class QueryError(ValueError):
+    """Raised for a path query that cannot be parsed."""
+
+    def __init__(self, message, query, position):
+        super().__init__(f"{message} at position {position} of {query!r}")
+        self.query = query
+        self.position = position
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def error(self, message):
+        raise QueryError(message, self.text, self.pos)
+
+    def skip_space(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def peek(self, token):
+        return self.text.startswith(token, self.pos)
+
+    def expect(self, token):
+        self.skip_space()
+        if not self.peek(token):
+            self.error(f"Expected {token!r}")
+        self.pos += len(token)
+
+    def match(self, pattern):
+        match = pattern.match(self.text, self.pos)
+        if match is None or match.end() == self.pos:
+            return None
+        self.pos = match.end()
+        return match
+
+    def parse(self):
+        self.skip_space()
+        root = self.match(_IDENTIFIER)
+        steps = []
+        if root is not None and root.group() != 'data':
+            steps.append(('key', root.group()))  # items[*] is short for data.items[*]
+        while True:
+            self.skip_space()
+            if self.pos >= len(self.text):
+                break
+            if self.peek('..'):
+                self.pos += 2
+                name = self.match(_IDENTIFIER)  # data..id is short for data..['id']
+                steps.append(('descent', ('key', name.group()) if name else self.parse_step(allow_filter=False)))
+            else:
+                steps.append(self.parse_step(allow_filter=True))
+        if root is None and not steps:
+            self.error("Empty query")
+        return 'data', tuple(steps)
+
+    def parse_step(self, allow_filter):
+        """Parse one .name or [...] step."""
+        if self.peek('.'):
+            self.pos += 1
+            name = self.match(_IDENTIFIER)
+            if name is None:
+                self.error("Expected a key name after '.'")
+            return ('key', name.group())
+        if not self.peek('['):
+            self.error("Expected '[' or '.'")
+        self.pos += 1
+        self.skip_space()
+        if self.peek('*'):
+            self.pos += 1
+            step = ('wildcard',)
+        elif self.peek('?'):
+            if not allow_filter:
+                self.error("A filter cannot follow '..'")
+            self.pos += 1
+            step = self.parse_filter()
+        elif self.peek("'") or self.peek('"'):
+            step = ('key', self.parse_string())
+        else:
+            match = self.match(_INDEX_OR_SLICE)
+            if match is None:
+                self.error("Expected a key, index, slice, '*' or filter")
+            start, colon, stop = match.groups()
+            if colon:
+                step = ('slice', None if start is None else int(start), None if stop is None else int(stop))
+            else:
+                step = ('index', int(start))
+        self.expect(']')
+        return step
+
+    def parse_string(self):
+        match = self.match(_STRING)
+        if match is None:
+            self.error("Unterminated string")
+        return ast.literal_eval(match.group())
+
+    def parse_filter(self):
+        """Parse (@... [op literal]) after '?'."""
+        self.expect('(')
+        self.expect('@')
+        relative = []
+        while True:
+            self.skip_space()
+            if not (self.peek('[') or self.peek('.')):
+                break
+            step = self.parse_step(allow_filter=False)
+            if step[0] not in ('key', 'index'):
+                self.error("Filters only support keys and indexes after '@'")
+            relative.append(step)
+        self.skip_space()
+        operator = self.match(_OPERATOR)
+        literal = None
+        if operator is not None:
+            operator = operator.group()
+            self.skip_space()
+            literal = self.parse_literal()
+        self.expect(')')
+        return ('filter', tuple(relative), operator, literal)
+
+    def parse_literal(self):
+        if self.peek("'") or self.peek('"'):
+            return self.parse_string()
+        number = self.match(_NUMBER)
+        if number is not None:
+            return json.loads(number.group())
+        word = self.match(_IDENTIFIER)
+        if word is not None and word.group() in _WORD_LITERALS:
+            return _WORD_LITERALS[word.group()]
+        self.error("Expected a string, number, true, false or null")
+
+
+def _children(value):
+    if isinstance(value, dict):
+        return value.items()
+    if isinstance(value, list):
+        return enumerate(value)
+    return ()
+
+
+def _join(path, key):
+    return None if path is None else path + format_path_segment(key)
+
+
+def _lookup(value, relative):
+    for kind, key in relative:
+        if kind == 'key':
+            if not isinstance(value, dict) or key not in value:
+                return _MISSING
+        elif not isinstance(value, list) or not -len(value) <= key < len(value):
+            return _MISSING
+        value = value[key]
+    return value
+
+
+def _compile_step(step):
+    """Return a function mapping (path, value) pairs to the pairs the step selects.
+
+    Paths are None when the caller does not need them. ``resolve``, when
+    given, is applied to every value before it is looked into.
+    """
+    kind = step[0]
+    if kind == 'key':
+        key = step[1]
+        segment = format_path_segment(key)
+
+        def select(items, resolve):
+            for path, value in items:
+                if resolve:
+                    value = resolve(value)
+                if isinstance(value, dict) and key in value:
+                    yield (None if path is None else path + segment), value[key]
+    elif kind == 'index':
+        index = step[1]
+
+        def select(items, resolve):
+            for path, value in items:
+                if resolve:
+                    value = resolve(value)
+                if isinstance(value, list) and -len(value) <= index < len(value):
+                    position = index % len(value)
+                    yield (None if path is None else f"{path}[{position}]"), value[position]
+    elif kind == 'slice':
+        bounds = slice(step[1], step[2])
+
+        def select(items, resolve):
+            for path, value in items:
+                if resolve:
+                    value = resolve(value)
+                if isinstance(value, list):
+                    for position in range(*bounds.indices(len(value))):
+                        yield (None if path is None else f"{path}[{position}]"), value[position]
+    elif kind == 'wildcard':
+        def select(items, resolve):
+            for path, value in items:
+                if resolve:
+                    value = resolve(value)
+                for key, child in _children(value):
+                    yield _join(path, key), child
+    elif kind == 'filter':
+        _, relative, operator, literal = step
+        compare = _COMPARISONS.get(operator)
+
+        def select(items, resolve):
+            for path, value in items:
+                if resolve:
+                    value = resolve(value)
+                for key, child in _children(value):
+                    if resolve:
+                        child = resolve(child)
+                    found = _lookup(child, relative)
+                    if found is _MISSING:
+                        continue
+                    if compare is not None:
+                        try:
+                            if not compare(found, literal):
+                                continue
+                        except TypeError:  # e.g. a string compared with a number
+                            continue
+                    yield _join(path, key), child
+    elif kind == 'descent':
+        inner = _compile_step(step[1])
+
+        def walk(path, value, resolve):
+            # Iterative pre-order walk over the value and all its descendants
+            stack = [(path, value)]
+            while stack:
+                path, value = stack.pop()
+                if resolve:
+                    value = resolve(value)
+                yield path, value
+                children = [(_join(path, key), child) for key, child in _children(value)]
+                stack.extend(reversed(children))
+
+        def select(items, resolve):
+            for path, value in items:
+                yield from inner(walk(path, value, resolve), resolve)
+    else:
+        raise ValueError(f"Unknown query step {kind!r}")
+    return select
+
+
+class PathQuery:
+    """A compiled path query; use ``compile_query`` to get one."""
+
+    def __init__(self, text):
+        self.text = text
+        self.root_name, self.steps = _Parser(text).parse()
+        self._plan = [_compile_step(step) for step in self.steps]
+
+    def __repr__(self):
+        return f"PathQuery({self.text!r})"
+
+    def evaluate(self, json_obj, root_path="data", resolve=None):
+        """Yield (path, value) for every match in ``json_obj``, in document order."""
+        items = iter([(root_path, json_obj)])
+        for select in self._plan:
+            items = select(items, resolve)
+        for path, value in items:
+            yield path, (resolve(value) if resolve else value)
+
+    def required_keys(self):
+        """Return the keys every matching record must contain somewhere."""
+        keys = []
+        for step in self.steps:
+            if step[0] == 'descent':
+                step = step[1]
+            if step[0] == 'key':
+                keys.append(step[1])
+        return keys
+
+    def generate_code(self, jsonl=False):
+        """Return Python code that collects every match into ``results``."""
+        return _generate_code(self, jsonl)
+
+
+@lru_cache(maxsize=256)
+def compile_query(text):
+    """Parse ``text`` into a PathQuery, reusing the plan of an identical earlier query."""
+    return PathQuery(text.strip())
+
+
+def _raw_key_pattern(key):
+    """Return the bytes a JSON line must contain if ``key`` is one of its keys, or None if unsure."""
+    if not isinstance(key, str) or not key.isascii() or not key.isprintable() or '"' in key or '\\' in key:
+        return None
+    return b'"' + key.encode('ascii') + b'"'
+
+
+class RecordQuery:
+    """Run a path query over every record of a LineIndex in one streaming pass.
+
+    Iterating yields lists of (record index, path, value) in record order,
+    one list per ``records_per_batch`` records. Records whose raw bytes lack
+    one of the query's keys are skipped without being decoded; lines that
+    are not valid JSON are counted in ``bad_lines``.
+    """
+
+    def __init__(self, line_index, query, limit=None, records_per_batch=RECORDS_PER_BATCH):
+        self.line_index = line_index
+        self.query = compile_query(query) if isinstance(query, str) else query
+        self.limit = limit
+        self.records_per_batch = records_per_batch
+        self.records_done = 0
+        self.match_count = 0
+        self.bad_lines = 0
+        self.stopped_early = False
+
+    def __iter__(self):
+        line_index = self.line_index
+        buffer = line_index.buffer
+        patterns = [p for p in map(_raw_key_pattern, self.query.required_keys()) if p is not None]
+        evaluate = self.query.evaluate
+        for first in range(0, len(line_index), self.records_per_batch):
+            stop = min(first + self.records_per_batch, len(line_index))
+            starts, ends = line_index.spans(first, stop)
+            batch = []
+            for n in range(stop - first):
+                raw = buffer[starts[n]:ends[n]]
+                if patterns and not all(pattern in raw for pattern in patterns):
+                    continue
+                try:
+                    json_obj = loads(raw)
+                except ValueError:
+                    self.bad_lines += 1
+                    continue
+                for path, value in evaluate(json_obj):
+                    batch.append((first + n, path, value))
+                    if self.limit is not None and self.match_count + len(batch) >= self.limit:
+                        break
+                if self.limit is not None and self.match_count + len(batch) >= self.limit:
+                    self.records_done = first + n + 1
+                    self.match_count += len(batch)
+                    self.stopped_early = self.records_done < len(line_index)
+                    yield batch
+                    return
+            self.records_done = stop
+            self.match_count += len(batch)
+            yield batch
+
+
+def preview_match(value):
+    if isinstance(value, (dict, list)) and not value:
+        return "{}" if isinstance(value, dict) else "[]"
+    return format_value_preview(value)
+
+
+_CHILDREN_HELPER = '''def children(value):
+    """Return the values of a dict or the items of a list"""
+    if isinstance(value, dict):
+        return list(value.values())
+    if isinstance(value, list):
+        return value
+    return []
+'''
+_WALK_HELPER = '''def walk(value):
+    """Yield value and every value nested inside it"""
+    yield value
+    for child in children(value):
+        yield from walk(child)
+'''
+
+
+def _guard(expression, step):
+    """Return a condition that holds when ``step`` can be applied to ``expression``."""
+    kind, key = step[0], step[1]
+    if kind == 'key':
+        return f"isinstance({expression}, dict) and {key!r} in {expression}"
+    if key >= 0:
+        return f"isinstance({expression}, list) and len({expression}) > {key}"
+    return f"isinstance({expression}, list) and len({expression}) >= {-key}"
+
+
+def _filter_condition(variable, relative, operator, literal):
+    conditions = []
+    expression = variable
+    for step in relative:
+        conditions.append(_guard(expression, step))
+        expression += format_path_segment(step[1])
+    if operator is not None:
+        if operator not in ('==', '!='):
+            if literal is None:
+                return "False"  # Nothing orders against null, as in the evaluator
+            # Ordering only compares values the literal can be ordered against, like the evaluator;
+            # true and false order like 1 and 0, against numbers as well
+            kinds = "(int, float)" if isinstance(literal, (int, float)) else type(literal).__name__
+            conditions.append(f"isinstance({expression}, {kinds})")
+        conditions.append(f"{expression} {operator} {literal!r}")
+    return " and ".join(conditions) or "True"
+
+
+def _generate_code(query, jsonl):
+    lines = []
+    helpers = set()
+    # Inside `with open(...)` and `for line in f` for JSONL
+    indent = "        " if jsonl else ""
+    expression = "data"
+    # Every key and index is checked first, as evaluate() does, so that records without it are skipped
+    guards = []
+    variables = 0
+
+    def new_variable():
+        nonlocal variables
+        variables += 1
+        return "item" if variables == 1 else f"item{variables}"
+
+    def add_guards():
+        nonlocal indent
+        if guards:
+            lines.append(f"{indent}if {' and '.join(guards)}:")
+            indent += "    "
+            guards.clear()
+
+    for step in query.steps:
+        kind = step[0]
+        if kind in ('key', 'index'):
+            guards.append(_guard(expression, step))
+            expression += format_path_segment(step[1])
+            continue
+        add_guards()
+        variable = new_variable()
+        if kind == 'wildcard':
+            helpers.add('children')
+            lines.append(f"{indent}for {variable} in children({expression}):")
+        elif kind == 'slice':
+            start = '' if step[1] is None else step[1]
+            stop = '' if step[2] is None else step[2]
+            lines.append(f"{indent}for {variable} in ({expression}[{start}:{stop}] "
+                         f"if isinstance({expression}, list) else []):")
+        elif kind == 'filter':
+            helpers.add('children')
+            lines.append(f"{indent}for {variable} in children({expression}):")
+            indent += "    "
+            lines.append(f"{indent}if {_filter_condition(variable, *step[1:])}:")
+        elif kind == 'descent':
+            helpers.update(('children', 'walk'))
+            lines.append(f"{indent}for {variable} in walk({expression}):")
+            inner = step[1]
+            if inner[0] in ('key', 'index'):
+                indent += "    "
+                lines.append(f"{indent}if {_guard(variable, inner)}:")
+                variable += format_path_segment(inner[1])
+            else:
+                inner_variable = new_variable()
+                if inner[0] == 'wildcard':
+                    indent += "    "
+                    lines.append(f"{indent}for {inner_variable} in children({variable}):")
+                else:  # slice
+                    start = '' if inner[1] is None else inner[1]
+                    stop = '' if inner[2] is None else inner[2]
+                    indent += "    "
+                    lines.append(f"{indent}for {inner_variable} in ({variable}[{start}:{stop}] "
+                                 f"if isinstance({variable}, list) else []):")
+                variable = inner_variable
+        indent += "    "
+        expression = variable
+    add_guards()
+
+    code = "import json\n\n"
+    if 'children' in helpers:
+        code += _CHILDREN_HELPER + "\n"
+    if 'walk' in helpers:
+        code += _WALK_HELPER + "\n"
+    code += f"# Collect every match of {query.text}\n"
+    code += "results = []\n"
+    if jsonl:
+        code += "with open(jsonl_path) as f:  # Replace jsonl_path with the path of your JSONL file\n"
+        code += "    for line in f:\n"
+        code += "        if not line.strip():\n"
+        code += "            continue\n"
+        code += "        data = json.loads(line)\n"
+    else:
+        code += "data = json.loads(json_string)  # Replace json_string with your JSON data\n"
+    code += "".join(line + "\n" for line in lines)
+    code += f"{indent}results.append({expression})\n"
+    code += "\nprint(len(results))"
+    return code
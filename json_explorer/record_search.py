@@ -0,0 +1,200 @@
+import os
+import re
+from bisect import bisect_right
+from contextlib import closing
+
+from .decoder import loads
+from .paths import iter_paths
+
+RECORDS_PER_CHUNK = 2000
+# Scalar types the Path Finder value search looks at
+SEARCHABLE_TYPES = (str, int, float, bool)
+
+_WORD = re.compile(r"[a-z0-9_\- ]+")
+# Letters that str() of a float or bool can produce without them appearing in the raw JSON
+_NUMBER_LETTERS = set("einftya")
+
+
+def raw_prefilter(query, mode, root_path="data"):
+    """Return a compiled bytes pattern every matching raw line must contain, or None.
+
+    The pattern is the longest word-like run of the query, matched
+    case-insensitively against the undecoded line so that lines which cannot
+    match are skipped without being parsed. A run is only used when it is
+    guaranteed to appear verbatim in the raw JSON: it must lie inside a key
+    (key mode) or a string value (value mode), so runs that could come from
+    the root name, list indexes or the str() form of numbers are not used.
+    """
+    query = query.lower()
+    if not query.isascii():
+        return None
+    best = ''
+    for run in _WORD.findall(query):
+        run = run.strip()
+        if mode == 'keys':
+            # Runs of digits may be list indexes, and parts of the root name are not in the line
+            if run in root_path.lower() or run.isdigit():
+                continue
+        elif not (set(run) - _NUMBER_LETTERS - set("0123456789.-+ ")):
+            continue
+        if len(run) > len(best):
+            best = run
+    if len(best) < 2:
+        return None
+    return re.compile(re.escape(best.encode('ascii')), re.IGNORECASE)
+
+
+def leaf_matches(path, value, query, mode):
+    """Return True if the leaf at ``path`` matches a lowercased Path Finder query."""
+    if mode == 'keys':
+        return query in path.lower()
+    return isinstance(value, SEARCHABLE_TYPES) and query in str(value).lower()
+
+
+def match_record(json_obj, query, mode, limit=None, root_path="data"):
+    """Return (path, preview) for every leaf of json_obj matching a Path Finder query.
+
+    ``query`` must already be lowercased.
+    """
+    matches = []
+    for row in iter_paths(json_obj, root_path):
+        if not leaf_matches(row[0], row[3] if len(row) == 4 else None, query, mode):
+            continue
+        matches.append((row[0], row[1]))
+        if limit is not None and len(matches) >= limit:
+            break
+    return matches
+
+
+def chunk_tasks(line_index, records_per_chunk=RECORDS_PER_CHUNK):
+    """Yield (source, base, starts, ends, first record) for every chunk of a LineIndex.
+
+    ``source`` is the path of the file when the index maps one, so that
+    worker processes read the chunk themselves instead of receiving its
+    bytes; otherwise it is the chunk's bytes, starting at offset ``base``.
+    """
+    for first in range(0, len(line_index), records_per_chunk):
+        stop = min(first + records_per_chunk, len(line_index))
+        starts, ends = line_index.spans(first, stop)
+        base = starts[0]
+        source = line_index.path if line_index.path else line_index.buffer[base:ends[-1]]
+        yield source, base, starts, ends, first
+
+
+def read_chunk(source, base, ends):
+    """Return the bytes of a chunk described by ``chunk_tasks``."""
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            f.seek(base)
+            return f.read(ends[-1] - base)
+    return source
+
+
+def map_chunks(function, tasks, workers, chunks_total):
+    """Yield ``function(*task)`` for every task, in completion order.
+
+    With several workers and chunks the tasks run in a spawned process
+    pool, keeping a bounded number in flight so that closing the generator
+    early stops quickly; otherwise they run here, one after another.
+    """
+    if chunks_total <= 1 or workers <= 1:
+        # Not worth starting worker processes
+        for task in tasks:
+            yield function(*task)
+        return
+
+    # Imported here so that the matching helpers stay cheap to import, e.g. for the CLI
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        tasks = iter(tasks)
+        pending = set()
+        for task in tasks:
+            pending.add(executor.submit(function, *task))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+            for task in tasks:
+                pending.add(executor.submit(function, *task))
+                if len(pending) >= 2 * workers:
+                    break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _search_chunk(source, base, starts, ends, first_record, query, mode, limit):
+    """Search one chunk of JSONL records; runs in a worker process."""
+    chunk = read_chunk(source, base, ends)
+
+    # Only parse the records whose raw bytes contain the prefilter text
+    prefilter = raw_prefilter(query, mode)
+    if prefilter is None:
+        candidates = range(len(starts))
+    else:
+        relative_starts = [start - base for start in starts]
+        candidates = sorted({bisect_right(relative_starts, m.start()) - 1 for m in prefilter.finditer(chunk)})
+
+    matches = []
+    bad_lines = 0
+    for n in candidates:
+        try:
+            json_obj = loads(chunk[starts[n] - base:ends[n] - base])
+        except ValueError:
+            bad_lines += 1
+            continue
+        for path, preview in match_record(json_obj, query, mode, limit - len(matches)):
+            matches.append((first_record + n, path, preview))
+        if len(matches) >= limit:
+            break
+    return len(starts), matches, bad_lines
+
+
+class RecordSearch:
+    """Search every record of a LineIndex with a process pool, streaming the matches.
+
+    Iterating yields one list of (record index, path, preview) per finished
+    chunk, in completion order. ``records_done``, ``chunks_done`` and
+    ``chunks_total`` track progress. Once ``limit`` matches have been found
+    the remaining chunks are cancelled and iteration stops.
+    """
+
+    def __init__(self, line_index, query, mode='keys', limit=1000, workers=None,
+                 records_per_chunk=RECORDS_PER_CHUNK):
+        self.line_index = line_index
+        self.query = query.lower()
+        self.mode = mode
+        self.limit = limit
+        self.workers = workers or os.cpu_count() or 1
+        self.records_per_chunk = records_per_chunk
+        self.chunks_total = -(-len(line_index) // records_per_chunk)
+        self.chunks_done = 0
+        self.records_done = 0
+        self.match_count = 0
+        self.bad_lines = 0
+        self.stopped_early = False
+
+    def _tasks(self):
+        for task in chunk_tasks(self.line_index, self.records_per_chunk):
+            yield task + (self.query, self.mode, self.limit)
+
+    def _record_chunk(self, result):
+        records, matches, bad_lines = result
+        self.chunks_done += 1
+        self.records_done += records
+        self.bad_lines += bad_lines
+        matches = matches[:self.limit - self.match_count]
+        self.match_count += len(matches)
+        return matches
+
+    def __iter__(self):
+        with closing(map_chunks(_search_chunk, self._tasks(), self.workers, self.chunks_total)) as results:
+            for result in results:
+                yield self._record_chunk(result)
+                if self.match_count >= self.limit:
+                    self.stopped_early = self.chunks_done < self.chunks_total
+                    return
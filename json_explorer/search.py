@@ -0,0 +1,257 @@
+from array import array
+from bisect import bisect_left
+
+from .node_index import DICT, SEARCHABLE_KINDS
+from .paths import format_path_segment
+
+NGRAM = 3
+
+
+class NgramIndex:
+    """Trigram index over a list of lowercased texts.
+
+    ``containing`` answers substring queries by looking up the trigram of the
+    query with the shortest posting list and checking only those texts.
+    """
+
+    def __init__(self, texts):
+        self.texts = texts
+        self._postings = {}
+        postings = self._postings
+        for text_id, text in enumerate(texts):
+            for gram in {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}:
+                ids = postings.get(gram)
+                if ids is None:
+                    ids = postings[gram] = array('i')
+                ids.append(text_id)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _candidates(self, query):
+        if len(query) < NGRAM:
+            return range(len(self.texts))
+        shortest = None
+        for i in range(len(query) - NGRAM + 1):
+            ids = self._postings.get(query[i:i + NGRAM])
+            if ids is None:
+                return ()
+            if shortest is None or len(ids) < len(shortest):
+                shortest = ids
+        return shortest
+
+    def containing(self, query, candidates=None):
+        """Return the ids of texts containing ``query``, in ascending order.
+
+        ``candidates`` restricts the check to a known superset of the answer,
+        e.g. the result for a shorter query that ``query`` extends.
+        """
+        texts = self.texts
+        if candidates is None:
+            candidates = self._candidates(query)
+        return [text_id for text_id in candidates if query in texts[text_id]]
+
+    def starting_with(self, prefix):
+        texts = self.texts
+        return [text_id for text_id in self._candidates(prefix) if texts[text_id].startswith(prefix)]
+
+
+class SearchResults:
+    """Sorted leaf node ids matching a search, stored as ranges of ``NodeIndex.leaves``.
+
+    A key search that matches a container matches every leaf below it, so
+    the result is kept as ranges and never expanded into one entry per leaf
+    unless it is iterated.
+    """
+
+    def __init__(self, leaves, ranges):
+        self._leaves = leaves
+        self._ranges = ranges
+        self._offsets = array('q', [0])
+        for start, stop in ranges:
+            self._offsets.append(self._offsets[-1] + stop - start)
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    def __iter__(self):
+        leaves = self._leaves
+        for start, stop in self._ranges:
+            yield from leaves[start:stop]
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            raise TypeError("SearchResults only supports slicing")
+        start, stop, _ = item.indices(len(self))
+        result = []
+        r = max(bisect_left(self._offsets, start + 1) - 1, 0)
+        while start < stop and r < len(self._ranges):
+            range_start, range_stop = self._ranges[r]
+            first = range_start + start - self._offsets[r]
+            last = min(range_stop, first + stop - start)
+            result.extend(self._leaves[first:last])
+            start += last - first
+            r += 1
+        return result
+
+
+class PathSearch:
+    """Key and value search over one NodeIndex, built once per document.
+
+    Key search works on path segments instead of full path strings: every
+    dict key and list position is one distinct segment text like ``['name']``
+    or ``[3]``, and a trigram index over those texts maps a query to the nodes
+    whose own segment contains it. All leaves below such a node match, and
+    because nodes are numbered in pre-order they form one contiguous range.
+    Queries spanning several segments, such as ``name'][0``, are split at
+    each ``[`` and the part before the split is checked against the parent
+    path one segment at a time.
+
+    Value search indexes the distinct lowercased scalar values, and is only
+    built on the first value query.
+    """
+
+    def __init__(self, node_index, root_path="data"):
+        self.node_index = node_index
+        key_count = len(node_index.keys)
+        kind, parent, key = node_index.kind, node_index.parent, node_index.key
+
+        # Segment ids: dict keys first, then list positions, then the root
+        max_position = -1
+        for i in range(1, len(kind)):
+            if kind[parent[i]] != DICT and key[i] > max_position:
+                max_position = key[i]
+        texts = [format_path_segment(k).lower() for k in node_index.keys]
+        texts.extend(f"[{position}]" for position in range(max_position + 1))
+        self._root_segment = len(texts)
+        texts.append(root_path.lower())
+        self._key_count = key_count
+
+        segment_nodes = [array('i') for _ in texts]
+        segment_nodes[self._root_segment].append(0)
+        for i in range(1, len(kind)):
+            if kind[parent[i]] == DICT:
+                segment_nodes[key[i]].append(i)
+            else:
+                segment_nodes[key_count + key[i]].append(i)
+        self._segment_nodes = segment_nodes
+        self.segments = NgramIndex(texts)
+
+        # Position in node_index.leaves of the first leaf at or after each node id
+        leaf_rank = self._leaf_rank = array('i', bytes(4 * (len(kind) + 1)))
+        rank = 0
+        leaves = node_index.leaves
+        for i in range(len(kind)):
+            leaf_rank[i] = rank
+            if rank < len(leaves) and leaves[rank] == i:
+                rank += 1
+        leaf_rank[len(kind)] = rank
+
+        self._value_texts = None
+        self._value_nodes = None
+        # mode -> (query, ids of the texts it matched) for narrowing the next query
+        self._last = {}
+
+    def _segment_id(self, i):
+        node_index = self.node_index
+        parent_id = node_index.parent[i]
+        if parent_id < 0:
+            return self._root_segment
+        if node_index.kind[parent_id] == DICT:
+            return node_index.key[i]
+        return self._key_count + node_index.key[i]
+
+    def _path_ends_with(self, i, suffix):
+        """Return True if the lowercased path of node ``i`` ends with ``suffix``."""
+        texts, parent = self.segments.texts, self.node_index.parent
+        while i >= 0:
+            segment = texts[self._segment_id(i)]
+            if len(suffix) <= len(segment):
+                return segment.endswith(suffix)
+            if not suffix.endswith(segment):
+                return False
+            suffix = suffix[:-len(segment)]
+            i = parent[i]
+        return False
+
+    def _narrowing_candidates(self, mode, query):
+        last = self._last.get(mode)
+        if last is not None and last[0] in query:
+            return last[1]
+        return None
+
+    def search_keys(self, query):
+        """Return the leaves whose path contains ``query`` (case-insensitive)."""
+        query = query.lower()
+        node_index = self.node_index
+        parent = node_index.parent
+
+        # Matches inside a single segment
+        segment_ids = self.segments.containing(query, self._narrowing_candidates('keys', query))
+        self._last['keys'] = (query, segment_ids)
+        matched = []
+        for segment_id in segment_ids:
+            matched.extend(self._segment_nodes[segment_id])
+        # Each segment's node list is already sorted, so one list needs no sort
+        is_sorted = len(segment_ids) <= 1
+
+        # Matches that start in an ancestor's segment and end in this one
+        split = query.find('[', 1)
+        while split != -1:
+            head, tail = query[:split], query[split:]
+            for segment_id in self.segments.starting_with(tail):
+                for i in self._segment_nodes[segment_id]:
+                    if self._path_ends_with(parent[i], head):
+                        matched.append(i)
+                        is_sorted = False
+            split = query.find('[', split + 1)
+        if not is_sorted:
+            matched = sorted(set(matched))
+
+        # Keep only the outermost matches; their subtrees cover the rest
+        end, leaf_rank = node_index.end, self._leaf_rank
+        ranges = []
+        covered_until = 0
+        for i in matched:
+            if i >= covered_until:
+                covered_until = end[i]
+                ranges.append((leaf_rank[i], leaf_rank[covered_until]))
+        return SearchResults(node_index.leaves, ranges)
+
+    def _build_value_index(self):
+        node_index = self.node_index
+        kind, values = node_index.kind, node_index.values
+        text_ids = {}
+        nodes = []
+        for i in node_index.leaves:
+            if kind[i] in SEARCHABLE_KINDS:
+                text = str(values[i]).lower()
+                text_id = text_ids.get(text)
+                if text_id is None:
+                    text_id = text_ids[text] = len(nodes)
+                    nodes.append(array('i'))
+                nodes[text_id].append(i)
+        self._value_texts = NgramIndex(list(text_ids))
+        self._value_nodes = nodes
+
+    def search_values(self, query):
+        """Return the scalar leaves whose value contains ``query`` (case-insensitive)."""
+        query = query.lower()
+        if self._value_texts is None:
+            self._build_value_index()
+        text_ids = self._value_texts.containing(query, self._narrowing_candidates('values', query))
+        self._last['values'] = (query, text_ids)
+        node_ids = []
+        for text_id in text_ids:
+            node_ids.extend(self._value_nodes[text_id])
+        node_ids.sort()
+        leaf_rank = self._leaf_rank
+        ranges = []
+        for i in node_ids:
+            position = leaf_rank[i]
+            if ranges and ranges[-1][1] == position:
+                ranges[-1] = (ranges[-1][0], position + 1)
+            else:
+                ranges.append((position, position + 1))
+        return SearchResults(self.node_index.leaves, ranges)
+
@@ -0,0 +1,301 @@
+"""Distinct scalar values with exact occurrence counts.
+
+``ValueIndex`` covers one parsed document and keeps the leaves of every
+value for paging through their paths. ``RecordValueCounts`` streams over
+every record of a JSONL input and keeps only counts, in bounded memory.
+Values are told apart by type as well as by value, so ``1``, ``1.0``,
+``True`` and ``"1"`` are four different values.
+"""
+import heapq
+import json
+from array import array
+from itertools import accumulate
+from operator import itemgetter
+
+from .decoder import loads
+from .node_index import BOOL, FLOAT, INT, KIND_NAMES, NULL, STR, kind_of
+from .paths import format_path_segment, format_value_preview
+from .record_search import SEARCHABLE_TYPES, raw_prefilter
+
+# Kinds counted as values: JSON scalars, not empty containers or lazy placeholders (STR to NULL)
+VALUE_KINDS = frozenset((STR, INT, FLOAT, BOOL, NULL))
+# Distinct values a streaming count tracks exactly before it keeps only the frequent ones
+DEFAULT_CAPACITY = 200_000
+RECORDS_PER_BATCH = 5000
+
+
+def value_matches(value, query):
+    """Return True if a scalar matches a lowercased Path Finder value query."""
+    return isinstance(value, SEARCHABLE_TYPES) and query in str(value).lower()
+
+
+def describe_value(kind, value):
+    """Return (preview, type name) for showing a counted value."""
+    return format_value_preview(value, max_length=60), KIND_NAMES[kind]
+
+
+class ValueIndex:
+    """Every distinct scalar value of a NodeIndex, with the leaves holding it.
+
+    Built in one pass over the leaves. Value ids follow first occurrence,
+    and the leaves of each value are stored back to back in one array in
+    document order, so a page of a value's paths is a slice.
+    """
+
+    def __init__(self, node_index):
+        self.node_index = node_index
+        kind, values = node_index.kind, node_index.values
+        value_of = self.value_of = array('i', [-1]) * len(kind)
+        counts = self.counts = array('q')
+        self.values = []
+        self.kinds = array('b')
+        ids = self._ids = {}
+        get_id, add_value, add_kind, add_count = ids.get, self.values.append, self.kinds.append, counts.append
+        for i in node_index.leaves:
+            node_kind = kind[i]
+            if not STR <= node_kind <= NULL:  # Skip empty containers and lazy placeholders
+                continue
+            key = (node_kind, values[i])
+            value_id = get_id(key)
+            if value_id is None:
+                value_id = ids[key] = len(counts)
+                add_value(key[1])
+                add_kind(node_kind)
+                add_count(1)
+            else:
+                counts[value_id] += 1
+            value_of[i] = value_id
+
+        # Counting sort of the leaves by value id
+        offsets = self._offsets = array('q', [0])
+        offsets.extend(accumulate(counts))
+        nodes = self._nodes = array('i', bytes(4 * offsets[-1]))
+        fill = offsets[:-1]
+        for i in node_index.leaves:
+            value_id = value_of[i]
+            if value_id >= 0:
+                nodes[fill[value_id]] = i
+                fill[value_id] += 1
+        self.total = offsets[-1]
+
+    def __len__(self):
+        return len(self.counts)
+
+    def find(self, value):
+        """Return the id of ``value``, or None if the document does not hold it."""
+        return self._ids.get((kind_of(value), value))
+
+    def value_ids(self, node_ids):
+        """Return the ids of the values held by ``node_ids``, in first-occurrence order."""
+        value_of = self.value_of
+        return sorted({value_of[i] for i in node_ids} - {-1})
+
+    def top(self, k, value_ids=None):
+        """Return (value id, count) for the ``k`` most frequent values, ties in document order.
+
+        ``value_ids`` restricts the ranking to those values. Only ``k`` ids
+        are kept in the heap, whatever the number of distinct values.
+        """
+        counts = self.counts
+        candidates = range(len(counts)) if value_ids is None else value_ids
+        return [(value_id, counts[value_id]) for value_id in heapq.nlargest(k, candidates, key=counts.__getitem__)]
+
+    def describe(self, value_id):
+        return describe_value(self.kinds[value_id], self.values[value_id])
+
+    def nodes(self, value_id, start=0, stop=None):
+        """Return the leaf node ids holding a value, optionally a slice of them."""
+        first, last = self._offsets[value_id], self._offsets[value_id + 1]
+        stop = last if stop is None else min(first + stop, last)
+        return self._nodes[first + start:stop]
+
+
+class ValueCounts:
+    """Occurrence counts of a stream of scalar values in bounded memory.
+
+    Counts are exact while at most ``capacity`` distinct values have been
+    seen. Past that the table becomes a Misra-Gries summary: adding an
+    untracked value to a full table decrements every count and drops the
+    values that reach zero. Any value occurring more than
+    ``total / (capacity + 1)`` times stays tracked, and no count is low by
+    more than ``error``.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.total = 0
+        self.error = 0
+
+    @property
+    def exact(self):
+        return self.error == 0
+
+    def add(self, kind, value):
+        key = (kind, value)
+        counts = self.counts
+        self.total += 1
+        if key in counts:
+            counts[key] += 1
+        elif len(counts) < self.capacity:
+            counts[key] = 1
+        else:
+            self.error += 1
+            self.counts = {key: count - 1 for key, count in counts.items() if count > 1}
+
+    def top(self, k):
+        """Return ((kind, value), count) for the ``k`` most frequent values."""
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
+
+
+def _iter_scalars(json_obj):
+    """Yield (kind, value) for every scalar in a decoded record."""
+    stack = [json_obj]
+    while stack:
+        value = stack.pop()
+        kind = kind_of(value)
+        if kind in VALUE_KINDS:
+            yield kind, value
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+
+
+class RecordValueCounts:
+    """Count the distinct scalar values of every record of a LineIndex.
+
+    Iterating runs the count and yields after every ``records_per_batch``
+    records; ``records_done`` and ``pass_number`` track progress. With a
+    ``query`` only values matching it like the Path Finder value search
+    are counted, and records whose raw bytes cannot match are not decoded.
+
+    When more than ``capacity`` distinct values occur, the first pass keeps
+    a Misra-Gries summary and a second pass recounts its values exactly.
+    The counts are then exact, but values occurring at most
+    ``threshold`` times may be missing; ``complete`` is False in that case.
+    """
+
+    def __init__(self, line_index, query='', capacity=DEFAULT_CAPACITY, records_per_batch=RECORDS_PER_BATCH):
+        self.line_index = line_index
+        self.query = query.lower()
+        self.records_per_batch = records_per_batch
+        self.values = ValueCounts(capacity)
+        self.pass_number = 1
+        self.records_done = 0
+        self.bad_lines = 0
+        self.complete = True
+        self.threshold = 0
+
+    def _scan(self, add):
+        line_index, query = self.line_index, self.query
+        buffer = line_index.buffer
+        prefilter = raw_prefilter(query, 'values') if query else None
+        self.records_done = 0
+        for first in range(0, len(line_index), self.records_per_batch):
+            stop = min(first + self.records_per_batch, len(line_index))
+            starts, ends = line_index.spans(first, stop)
+            for n in range(stop - first):
+                raw = buffer[starts[n]:ends[n]]
+                if prefilter is not None and not prefilter.search(raw):
+                    continue
+                try:
+                    json_obj = loads(raw)
+                except ValueError:
+                    if self.pass_number == 1:
+                        self.bad_lines += 1
+                    continue
+                for kind, value in _iter_scalars(json_obj):
+                    if not query or value_matches(value, query):
+                        add(kind, value)
+            self.records_done = stop
+            yield
+
+    def __iter__(self):
+        yield from self._scan(self.values.add)
+        if self.values.exact:
+            return
+
+        # Recount the values the summary kept; any value it dropped occurs at most total / (capacity + 1) times
+        self.complete = False
+        self.threshold = self.values.total // (self.values.capacity + 1)
+        counts = dict.fromkeys(self.values.counts, 0)
+
+        def recount(kind, value):
+            key = (kind, value)
+            if key in counts:
+                counts[key] += 1
+
+        self.pass_number = 2
+        yield from self._scan(recount)
+        self.values.counts = counts
+        self.values.error = 0
+
+    def top(self, k):
+        return self.values.top(k)
+
+
+def _raw_value_pattern(kind, value):
+    """Return bytes every raw line holding ``value`` must contain, or None.
+
+    For a string this only holds for lines without a backslash: any
+    character may be written as an escape, e.g. ``"\\u0041"`` for ``"A"``.
+    """
+    if kind == STR:
+        text = json.dumps(value)
+        # Escaped or non-ASCII strings may be written differently in the file
+        return None if '\\' in text or not text.isascii() else text.encode('ascii')
+    if kind == BOOL:
+        return b'true' if value else b'false'
+    if kind == NULL:
+        return b'null'
+    if kind == INT:
+        return str(value).encode('ascii')
+    return None
+
+
+def iter_value_locations(line_index, kind, value, start=0, root_path="data"):
+    """Yield (record index, path) for every occurrence of a value, from record ``start`` on."""
+    pattern = _raw_value_pattern(kind, value)
+    buffer = line_index.buffer
+    for record in range(start, len(line_index)):
+        begin, end = line_index.span(record)
+        raw = buffer[begin:end]
+        # Strings may be spelled with escapes, such as "http:\/\/" in PHP output, so such lines are decoded
+        if pattern is not None and pattern not in raw and not (kind == STR and b'\\' in raw):
+            continue
+        try:
+            json_obj = loads(raw)
+        except ValueError:
+            continue
+        stack = [(json_obj, root_path)]
+        found = []
+        while stack:
+            item, path = stack.pop()
+            if isinstance(item, dict):
+                stack.extend((child, path + format_path_segment(key)) for key, child in reversed(item.items()))
+            elif isinstance(item, list):
+                stack.extend((child, f"{path}[{i}]") for i, child in reversed(list(enumerate(item))))
+            elif kind_of(item) == kind and item == value:
+                found.append(path)
+        for path in found:
+            yield record, path
+
+
+def value_locations_page(line_index, kind, value, cursor=(0, 0), page_size=20):
+    """Return one page of (record index, path) for a value and the cursor of the next page.
+
+    A cursor is (record index, occurrences of the value in that record to
+    skip); the next cursor is None on the last page.
+    """
+    start, skip = cursor
+    rows = []
+    for record, path in iter_value_locations(line_index, kind, value, start):
+        if record == start and skip:
+            skip -= 1
+            continue
+        if len(rows) == page_size:
+            in_record = sum(1 for row_record, _ in rows if row_record == record)
+            return rows, (record, in_record + (cursor[1] if record == cursor[0] else 0))
+        rows.append((record, path))
+    return rows, None
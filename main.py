@@ -1,11 +1,67 @@
 import streamlit as st
 import json
-import re
-from collections import defaultdict
+import os
+import time
+from collections import deque
+from itertools import islice
+
+import numpy as np
+
+from json_explorer.cache import LRUCache, content_key
+from json_explorer.codegen import generate_python_code
+from json_explorer.diff import ADDED, CHANGED, REMOVED, diff_documents, subtree_hashes
+from json_explorer.decoder import loads
+from json_explorer.columns import ColumnError, ColumnStore, compile_filter, format_column, parse_sort, sort_records
+from json_explorer.instrument import RerunProfile, TracingOwner, WidgetCounter, has_export_hooks, jsonl_memory
+from json_explorer.lazy import LazyDocument, LazyValue, SubtreeSearch, format_size
+from json_explorer.line_check import LineCheck
+from json_explorer.line_index import LineIndex
+from json_explorer.node_index import DICT, LIST, NodeIndex
+from json_explorer.parsing import parse_buffer, parse_path, parse_text
+from json_explorer.profile import SchemaProfile
+from json_explorer.query import QueryError, RecordQuery, compile_query, preview_match
+from json_explorer.record_search import RecordSearch
+from json_explorer.search import PathSearch
+from json_explorer.values import RecordValueCounts, ValueIndex, describe_value, value_locations_page
+
+DOC_CACHE_MAX_ENTRIES = 16
+DOC_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Matches shown while a search over all JSONL records is still running
+RECORD_SEARCH_PREVIEW_ROWS = 20
+# Paths shown per page for one value in the Path Finder value mode
+VALUE_PATHS_PAGE_SIZE = 20
+# Matching records previewed in the Filter Records tab
+FILTER_PREVIEW_ROWS = 100
+# Changes listed in the Diff tab
+DIFF_MAX_CHANGES = 5000
+# Seconds between progress updates of the background check of every JSONL line
+LINE_CHECK_REFRESH_SECONDS = 1
+# Seconds an input must stay unchanged before its lines are checked, so that edits do not each start a pool
+LINE_CHECK_SETTLE_SECONDS = 2
+# Widgets emitted by one Tree Explorer row: columns, toggle and expand-subtree buttons, label, Get Path
+TREE_BRANCH_WIDGETS = 8
+TREE_LEAF_WIDGETS = 6
+# Widgets emitted by the page controls of a large container (four columns, two buttons, label, jump box)
+TREE_PAGER_WIDGETS = 8
+# Reruns kept in the performance panel's history
+PERF_HISTORY_LENGTH = 100
+# Matches of a path query kept for display
+QUERY_MAX_MATCHES = 10_000
+
+# Function to stop a source's background line check; it starts over if the source is shown again
+def cancel_line_check(source):
+    line_check = source.get('line_check')
+    if line_check is not None and not line_check.done:
+        line_check.cancel()
+        source['line_check'] = None
+
+# Function to release what an evicted cache entry holds: the line check and the file a JSONL source maps
+def release_source(key, value):
+    if isinstance(value, dict) and 'line_index' in value:
+        cancel_line_check(value)
+        value['line_index'].close()
 
 # Initialize session state variables
-if 'expanded_keys' not in st.session_state:
-    st.session_state.expanded_keys = set()
 if 'json_input' not in st.session_state:
     st.session_state['json_input'] = ''
 if 'generated_code' not in st.session_state:
@@ -14,69 +70,33 @@ if 'search_query' not in st.session_state:
     st.session_state['search_query'] = ''
 if 'selected_jsonl_index' not in st.session_state:
     st.session_state['selected_jsonl_index'] = 0
+if 'jsonl_record_number' not in st.session_state:
+    st.session_state['jsonl_record_number'] = 1
+if 'doc_cache' not in st.session_state:
+    # Parsed documents and their path indexes, keyed by input content hash
+    st.session_state['doc_cache'] = LRUCache(max_entries=DOC_CACHE_MAX_ENTRIES, max_weight=DOC_CACHE_MAX_BYTES,
+                                             on_evict=release_source)
+if 'tree_page_size' not in st.session_state:
+    st.session_state['tree_page_size'] = 50  # Children shown per page of a dict or list
+if 'tree_widget_limit' not in st.session_state:
+    st.session_state['tree_widget_limit'] = 600  # Widgets the Tree Explorer may emit per rerun
 if 'search_results' not in st.session_state:
     st.session_state['search_results'] = []
 if 'view_mode' not in st.session_state:
     st.session_state['view_mode'] = 'path_finder'  # 'path_finder' or 'tree_view'
 if 'display_mode' not in st.session_state:
     st.session_state['display_mode'] = 'keys'  # 'keys' or 'values'
+if 'perf_history' not in st.session_state:
+    st.session_state['perf_history'] = deque(maxlen=PERF_HISTORY_LENGTH)
+if 'perf_tracing_owner' not in st.session_state:
+    st.session_state['perf_tracing_owner'] = TracingOwner()  # Allocation tracing runs while a session holds it
 
-# Function to generate Python code for accessing a specific item
-def generate_python_code(path):
-    """Generate Python code to access a specific JSON path"""
-    code = "import json\n\n"
-    code += "# Load your JSON data\n"
-    code += "data = json.loads(json_string)  # Replace json_string with your JSON data\n\n"
-    code += f"# Access the specific path\n"
-    code += f"value = {path}\n"
-    code += "print(value)"
-    return code
-
-# Function to format value previews based on type
-def format_value_preview(value, max_length=30):
-    if isinstance(value, str):
-        return f'"{value[:max_length]}{"..." if len(value) > max_length else ""}"'
-    elif isinstance(value, (dict, list)):
-        return f"{type(value).__name__} with {len(value)} items"
-    else:
-        return str(value)
-
-# Function to extract paths from JSON
-def extract_paths(json_obj, current_path="data", paths=None):
-    """Extract all possible paths from JSON object"""
-    if paths is None:
-        paths = []
-    
-    if isinstance(json_obj, dict):
-        if not json_obj:  # Handle empty dict
-            paths.append((current_path, "{}"))
-            return paths
-            
-        for key, value in json_obj.items():
-            new_path = f"{current_path}['{key}']" if isinstance(key, str) else f"{current_path}[{key}]"
-            if isinstance(value, (dict, list)):
-                extract_paths(value, new_path, paths)
-            else:
-                preview = format_value_preview(value)
-                paths.append((new_path, preview, key, value))
-    elif isinstance(json_obj, list):
-        if not json_obj:  # Handle empty list
-            paths.append((current_path, "[]"))
-            return paths
-            
-        for i, item in enumerate(json_obj):
-            new_path = f"{current_path}[{i}]"
-            if isinstance(item, (dict, list)):
-                extract_paths(item, new_path, paths)
-            else:
-                preview = format_value_preview(item)
-                paths.append((new_path, preview, i, item))
-    else:
-        # This handles the case where the root is a primitive
-        preview = format_value_preview(json_obj)
-        paths.append((current_path, preview, None, json_obj))
-    
-    return paths
+# Time the stages of this rerun; elements are counted when the performance panel is on or an export hook is set
+perf_panel = st.session_state.get('perf_panel', False)
+perf = RerunProfile(trace_allocations=perf_panel and st.session_state.get('perf_trace_alloc', False),
+                    owner=st.session_state['perf_tracing_owner'])
+if perf_panel or has_export_hooks():
+    st = WidgetCounter(st, perf.widgets)
 
 # Function to load example JSON
 def load_example():
@@ -104,8 +124,759 @@ def load_example():
     }
     st.session_state['json_input'] = json.dumps(example_json, indent=4)
     st.session_state['generated_code'] = ''
-    st.session_state.expanded_keys.clear()
     st.session_state['selected_jsonl_index'] = 0
+    st.session_state['jsonl_record_number'] = 1
+    st.session_state['input_source'] = "Paste text"
+
+# Function to wrap a parsed document for the cache; its indexes are built on first use
+def new_document(json_obj, root_path="data"):
+    return {
+        'json': json_obj,
+        'root_path': root_path,  # Access path of json_obj, for subtrees of a lazily opened document
+        'node_index': None,
+        'path_search': None,
+        'value_index': None,
+        'subtree_hashes': None,
+        'value_groups': None,  # (search query, ids of the values its results hold)
+        'expanded': set(),  # Node ids of expanded containers in the Tree Explorer
+        'page_offsets': {},  # Node id -> offset of the page of children shown
+        'schema_profile': None,
+    }
+
+# Function to wrap the result of parse_text, parse_buffer or parse_path as a cached source
+def new_source(parsed):
+    if isinstance(parsed, LineIndex):
+        # Columns are flattened by the Filter Records tab; the memory report and line check start on first display
+        return {'line_index': parsed, 'columns': None, 'memory': None, 'line_check': None}
+    if isinstance(parsed, LazyDocument):
+        return dict(new_document(parsed.root), lazy=parsed)
+    return new_document(parsed)
+
+# Function to build a document's path index on first use
+def get_node_index(document):
+    if document['node_index'] is None:
+        document['node_index'] = NodeIndex(document['json'])
+    return document['node_index']
+
+# Function to hash every subtree of a document on first use, for the Diff tab
+def get_subtree_hashes(document):
+    if document['subtree_hashes'] is None:
+        document['subtree_hashes'] = subtree_hashes(get_node_index(document))
+    return document['subtree_hashes']
+
+# Function to decode a subtree of a lazy document, cached like a JSONL record so unused subtrees are evicted
+def load_subtree(source_key, lazy_document, lazy_value):
+    return st.session_state['doc_cache'].get_or_create(
+        (source_key, 'subtree', lazy_value.start),
+        lambda: new_document(lazy_document.decode(lazy_value), root_path=lazy_value.path()),
+        weight=lazy_value.size,
+    )
+
+# Callback for the JSONL Navigator previous/next buttons
+def step_jsonl_record(step, total_records):
+    record_number = st.session_state['jsonl_record_number'] + step
+    st.session_state['jsonl_record_number'] = min(max(record_number, 1), total_records)
+
+# Callbacks for the Tree Explorer expand controls and page controls of large dicts and lists
+def toggle_node(expanded_nodes, node_id):
+    if node_id in expanded_nodes:
+        expanded_nodes.remove(node_id)
+    else:
+        expanded_nodes.add(node_id)
+
+def expand_subtree(expanded_nodes, node_index, node_id):
+    expanded_nodes.update(node_index.subtree_containers(node_id))
+
+def set_tree_page(page_offsets, node_id, offset, jump_key):
+    page_offsets[node_id] = offset
+    st.session_state[jump_key] = offset
+
+def jump_tree_page(page_offsets, node_id, page_size, jump_key):
+    item = st.session_state[jump_key]
+    page_offsets[node_id] = (item // page_size) * page_size
+
+# Callback to open a JSONL record in the navigator
+def open_jsonl_record(record_index):
+    st.session_state['jsonl_record_number'] = record_index + 1
+
+# Callbacks to step the JSONL Navigator through the records matched in the Filter Records tab
+def step_filtered_record(record_filter, step):
+    indices = record_filter['indices']
+    record_filter['position'] = min(max(record_filter['position'] + step, 0), len(indices) - 1)
+    st.session_state['jsonl_record_number'] = int(indices[record_filter['position']]) + 1
+
+def set_record_filter_active(record_filter, active):
+    record_filter['active'] = active
+    if active:
+        record_filter['position'] = 0
+        st.session_state['jsonl_record_number'] = int(record_filter['indices'][0]) + 1
+
+# Callback to move through the pages of records holding a value, remembering each page's cursor
+def step_record_value_page(pages, step, next_cursor):
+    if step > 0:
+        del pages['cursors'][pages['page'] + 1:]
+        pages['cursors'].append(next_cursor)
+    pages['page'] += step
+
+# Fragment to show the progress of the background line check, rerunning the app once it is done
+@st.fragment(run_every=LINE_CHECK_REFRESH_SECONDS)
+def display_line_check_progress(line_check):
+    if line_check.done:
+        st.rerun()
+    total_records = len(line_check.line_index)
+    st.progress(line_check.records_done / total_records,
+                text=f"Checking lines: {line_check.records_done:,} of {total_records:,}"
+                     + (f", {line_check.bad_count:,} not valid JSON" if line_check.bad_count else ""))
+
+# Fragment to start the background line check once the input has stopped changing
+@st.fragment(run_every=LINE_CHECK_REFRESH_SECONDS)
+def display_line_check_pending(source):
+    if time.monotonic() - st.session_state['active_source_since'] >= LINE_CHECK_SETTLE_SECONDS:
+        source['line_check'] = LineCheck(source['line_index']).start()
+        st.rerun()
+    st.caption("Checking every line once the input stops changing…")
+
+# Function to report the JSONL lines that are not valid JSON, once the background check is done
+def display_line_check(line_check):
+    if not line_check.done:
+        display_line_check_progress(line_check)
+        return
+    total_records = len(line_check.line_index)
+    if line_check.error is not None:
+        st.warning(f"⚠️ Could not check every line: {line_check.error}")
+    elif not line_check.bad_count:
+        st.caption(f"✅ All {total_records:,} records are valid JSON")
+    else:
+        st.warning(f"⚠️ {line_check.bad_count:,} of {total_records:,} lines are not valid JSON")
+        with st.expander("Invalid lines"):
+            st.dataframe(
+                [{'Line': line_number, 'Record': record + 1, 'Column': column, 'Offset': offset, 'Error': message}
+                 for record, line_number, message, column, offset in line_check.bad_lines],
+                hide_index=True,
+            )
+            if line_check.bad_count > len(line_check.bad_lines):
+                st.caption(f"Showing {len(line_check.bad_lines):,} of them; offsets are bytes into the input")
+            else:
+                st.caption("Offsets are bytes into the input")
+
+# Function to search all JSONL records in worker processes, streaming matches as chunks finish
+def display_record_search(line_index, source_key, search_query, mode):
+    col_limit, col_run = st.columns([1, 3])
+    with col_limit:
+        limit = st.number_input("Stop after matches:", min_value=1, max_value=1_000_000, value=1000,
+                                step=100, key='record_search_limit')
+    search_key = (source_key, search_query.lower(), mode, limit)
+    
+    with col_run:
+        st.write("")  # Align the button with the limit box
+        run_search = st.button("🔎 Search all records", disabled=not search_query)
+    
+    if run_search:
+        record_search = RecordSearch(line_index, search_query, mode, limit=limit)
+        progress = st.progress(0.0, text="Starting workers...")
+        live_results = st.empty()
+        matches = []
+        for batch in record_search:
+            matches.extend(batch)
+            progress.progress(record_search.chunks_done / record_search.chunks_total,
+                              text=f"Searched {record_search.records_done:,} of {len(line_index):,} records · "
+                                   f"{len(matches):,} matches")
+            live_results.dataframe(
+                [{'Record': r + 1, 'Path': p, 'Value': v} for r, p, v in matches[-RECORD_SEARCH_PREVIEW_ROWS:]]
+            )
+        progress.empty()
+        live_results.empty()
+        matches.sort(key=lambda match: match[0])
+        st.session_state['record_search'] = {
+            'key': search_key,
+            'matches': matches,
+            'records_done': record_search.records_done,
+            'stopped_early': record_search.stopped_early,
+            'bad_lines': record_search.bad_lines,
+        }
+    
+    result = st.session_state.get('record_search')
+    if not search_query:
+        st.info("Type a key or value to search for, then run the search.")
+    elif not result or result['key'] != search_key:
+        st.info("Press 🔎 Search all records to run this query over every record.")
+    elif not result['matches']:
+        st.info("No records match your search.")
+    else:
+        matches = result['matches']
+        summary = f"Found {len(matches):,} matches in {len({r for r, _, _ in matches}):,} records"
+        if result['stopped_early']:
+            summary += f" (stopped after the first {len(matches):,}; searched {result['records_done']:,} records)"
+        st.write(summary + (" (showing first 100)" if len(matches) > 100 else ""))
+        if result['bad_lines']:
+            st.caption(f"⚠️ Skipped {result['bad_lines']:,} lines that are not valid JSON")
+        
+        for i, (record_index, path, preview) in enumerate(matches[:100]):
+            col1, col2, col3 = st.columns([3, 0.5, 0.5])
+            with col1:
+                st.markdown(f"""
+                <div class="search-result">
+                    <div class="path-display">Record {record_index + 1:,}: {path}</div>
+                    <div class="value-preview">Value: {preview}</div>
+                </div>
+                """, unsafe_allow_html=True)
+            with col2:
+                st.button("Open", key=f"record_open_{i}", on_click=open_jsonl_record, args=(record_index,))
+            with col3:
+                if st.button("Get Path", key=f"record_path_{i}"):
+                    st.session_state['generated_code'] = generate_python_code(path)
+
+# Function to pick how many of the most frequent values to show and one of them to page through
+def select_top_value(rows, key_prefix):
+    """Show the value table and return the index in ``rows`` of the value whose paths to show"""
+    st.dataframe(rows)
+    return st.selectbox(
+        "Show paths of:", range(len(rows)), key=f'{key_prefix}_choice',
+        format_func=lambda n: f"{rows[n]['Value']} ({rows[n]['Type']}, {rows[n]['Count']:,} occurrences)",
+    )
+
+# Function to count every distinct value of the current document and page through the paths of one
+def display_value_counts(document, node_index, search_query):
+    if document['value_index'] is None:
+        document['value_index'] = ValueIndex(node_index)
+    value_index = document['value_index']
+    
+    # With a search, rank only the values its results hold; the results hold every occurrence of them
+    value_ids = None
+    if search_query:
+        if document['value_groups'] is None or document['value_groups'][0] != search_query:
+            document['value_groups'] = (search_query, value_index.value_ids(st.session_state['search_results']))
+        value_ids = document['value_groups'][1]
+        occurrences = sum(value_index.counts[value_id] for value_id in value_ids)
+    else:
+        occurrences = value_index.total
+    distinct = len(value_index) if value_ids is None else len(value_ids)
+    if not distinct:
+        st.info("No values found matching your search.")
+        return
+    
+    top_k = st.number_input("Most frequent values:", min_value=1, max_value=1000, value=20, step=10,
+                            key='value_top_k')
+    top = value_index.top(top_k, value_ids)
+    st.write(f"Found {distinct:,} distinct values in {occurrences:,} paths" +
+             (f" (showing the {len(top):,} most frequent)" if distinct > len(top) else ""))
+    if document.get('lazy') is not None:
+        st.caption("💤 Values inside unloaded subtrees are not counted.")
+    
+    rows = []
+    for value_id, count in top:
+        preview, type_name = value_index.describe(value_id)
+        rows.append({'Value': preview, 'Type': type_name, 'Count': count, 'Share': f"{count / occurrences:.1%}"})
+    value_id, count = top[select_top_value(rows, 'value_paths')]
+    
+    # Page through the paths holding the chosen value
+    page_offsets = st.session_state.setdefault('value_page_offsets', {})
+    offset = min(page_offsets.get(value_id, 0), ((count - 1) // VALUE_PATHS_PAGE_SIZE) * VALUE_PATHS_PAGE_SIZE)
+    if count > VALUE_PATHS_PAGE_SIZE:
+        col_prev, col_info, col_next = st.columns([0.1, 0.75, 0.15])
+        with col_prev:
+            st.button("◀", key="value_paths_prev", disabled=offset == 0,
+                      on_click=page_offsets.__setitem__, args=(value_id, offset - VALUE_PATHS_PAGE_SIZE))
+        with col_next:
+            st.button("▶", key="value_paths_next", disabled=offset + VALUE_PATHS_PAGE_SIZE >= count,
+                      on_click=page_offsets.__setitem__, args=(value_id, offset + VALUE_PATHS_PAGE_SIZE))
+        with col_info:
+            st.caption(f"Paths {offset + 1:,}–{min(offset + VALUE_PATHS_PAGE_SIZE, count):,} of {count:,}")
+    for node_id in value_index.nodes(value_id, offset, offset + VALUE_PATHS_PAGE_SIZE):
+        path = node_index.path(node_id)
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.markdown(f"<div class='path-display'>{path}</div>", unsafe_allow_html=True)
+        with col2:
+            if st.button("Get Path", key=f"value_path_{node_id}"):
+                st.session_state['generated_code'] = generate_python_code(path)
+
+# Function to count the distinct values of every JSONL record and page through the records holding one
+def display_record_value_counts(line_index, source_key, search_query):
+    count_key = (source_key, search_query.lower())
+    if st.button("📊 Count values in all records",
+                 help="Exact counts of every distinct value (matching the search, if any) across all records"):
+        record_counts = RecordValueCounts(line_index, search_query)
+        progress = st.progress(0.0, text="Counting values...")
+        for _ in record_counts:
+            step = "Recounting the most frequent values" if record_counts.pass_number == 2 else "Counted"
+            progress.progress(record_counts.records_done / len(line_index),
+                              text=f"{step}: {record_counts.records_done:,} of {len(line_index):,} records")
+        progress.empty()
+        st.session_state['record_value_counts'] = {
+            'key': count_key,
+            'top': record_counts.top(1000),
+            'distinct': len(record_counts.values.counts),
+            'total': record_counts.values.total,
+            'complete': record_counts.complete,
+            'threshold': record_counts.threshold,
+            'bad_lines': record_counts.bad_lines,
+        }
+        st.session_state['record_value_pages'] = None
+    
+    result = st.session_state.get('record_value_counts')
+    if not result or result['key'] != count_key:
+        return
+    if not result['top']:
+        st.info("No values found matching your search.")
+        return
+    
+    top_k = st.number_input("Most frequent values:", min_value=1, max_value=len(result['top']),
+                            value=min(20, len(result['top'])), step=10, key='record_value_top_k')
+    top = result['top'][:top_k]
+    if result['complete']:
+        st.write(f"Found {result['distinct']:,} distinct values in {result['total']:,} paths" +
+                 (f" (showing the {len(top):,} most frequent)" if result['distinct'] > len(top) else ""))
+    else:
+        st.write(f"Found more than {result['distinct']:,} distinct values in {result['total']:,} paths; "
+                 f"counts are exact, but values occurring {result['threshold']:,} times or fewer are not listed")
+    if result['bad_lines']:
+        st.caption(f"⚠️ Skipped {result['bad_lines']:,} lines that are not valid JSON")
+    
+    rows = []
+    for (kind, value), count in top:
+        preview, type_name = describe_value(kind, value)
+        rows.append({'Value': preview, 'Type': type_name, 'Count': count,
+                     'Share': f"{count / result['total']:.1%}"})
+    (kind, value), count = top[select_top_value(rows, 'record_value_paths')]
+    
+    # Pages are found by scanning forward from a cursor; earlier cursors are kept for going back
+    pages = st.session_state.get('record_value_pages')
+    if not pages or pages['value'] != (kind, value):
+        pages = st.session_state['record_value_pages'] = {'value': (kind, value), 'cursors': [(0, 0)], 'page': 0}
+    page = pages['page']
+    rows, next_cursor = value_locations_page(line_index, kind, value, pages['cursors'][page], VALUE_PATHS_PAGE_SIZE)
+    if page or next_cursor:
+        col_prev, col_info, col_next = st.columns([0.1, 0.75, 0.15])
+        with col_prev:
+            st.button("◀", key="record_value_prev", disabled=page == 0,
+                      on_click=step_record_value_page, args=(pages, -1, None))
+        with col_next:
+            st.button("▶", key="record_value_next", disabled=next_cursor is None,
+                      on_click=step_record_value_page, args=(pages, 1, next_cursor))
+        with col_info:
+            first = page * VALUE_PATHS_PAGE_SIZE
+            st.caption(f"Paths {first + 1:,}–{first + len(rows):,} of {count:,}")
+    for i, (record_index, path) in enumerate(rows):
+        col1, col2, col3 = st.columns([3, 0.5, 0.5])
+        with col1:
+            st.markdown(f"<div class='path-display'>Record {record_index + 1:,}: {path}</div>",
+                        unsafe_allow_html=True)
+        with col2:
+            st.button("Open", key=f"record_value_open_{i}", on_click=open_jsonl_record, args=(record_index,))
+        with col3:
+            if st.button("Get Path", key=f"record_value_path_{i}"):
+                st.session_state['generated_code'] = generate_python_code(path)
+
+# Function to search inside the undecoded subtrees of a lazily opened document
+def display_subtree_search(lazy_document, source_key, search_query, mode):
+    col_limit, col_run = st.columns([1, 3])
+    with col_limit:
+        limit = st.number_input("Stop after matches:", min_value=1, max_value=1_000_000, value=1000,
+                                step=100, key='subtree_search_limit')
+    search_key = (source_key, search_query.lower(), mode, limit)
+    
+    with col_run:
+        st.write("")  # Align the button with the limit box
+        run_search = st.button("🔎 Search whole document", disabled=not search_query)
+    
+    if run_search:
+        doc_cache = st.session_state['doc_cache']
+        
+        def loaded_subtree(lazy_value):
+            document = doc_cache.get((source_key, 'subtree', lazy_value.start))
+            return document['json'] if document else None
+        
+        subtree_search = SubtreeSearch(lazy_document, search_query, mode, limit=limit, loaded=loaded_subtree)
+        progress = st.progress(0.0, text="Searching...")
+        matches = []
+        for batch in subtree_search:
+            matches.extend(batch)
+            progress.progress(subtree_search.bytes_done / max(subtree_search.bytes_total, 1),
+                              text=f"Searched {format_size(subtree_search.bytes_done)} of "
+                                   f"{format_size(subtree_search.bytes_total)} · {len(matches):,} matches")
+        progress.empty()
+        st.session_state['subtree_search'] = {
+            'key': search_key,
+            'matches': matches,
+            'stopped_early': subtree_search.stopped_early,
+        }
+    
+    result = st.session_state.get('subtree_search')
+    if not search_query:
+        st.info("Type a key or value to search for, then run the search.")
+    elif not result or result['key'] != search_key:
+        st.info("Press 🔎 Search whole document to decode and search every subtree.")
+    elif not result['matches']:
+        st.info("No paths inside the subtrees match your search.")
+    else:
+        matches = result['matches']
+        summary = f"Found {len(matches):,} paths"
+        if result['stopped_early']:
+            summary += f" (stopped after the first {len(matches):,})"
+        st.write(summary + (" (showing first 100)" if len(matches) > 100 else ""))
+        
+        for i, (path, preview) in enumerate(matches[:100]):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.markdown(f"""
+                <div class="search-result">
+                    <div class="path-display">{path}</div>
+                    <div class="value-preview">Value: {preview}</div>
+                </div>
+                """, unsafe_allow_html=True)
+            with col2:
+                if st.button("Get Path", key=f"subtree_path_{i}"):
+                    st.session_state['generated_code'] = generate_python_code(path)
+
+# Function to show the schema profile table and its summary line
+def display_profile_table(profile, placeholder):
+    with placeholder.container():
+        st.write(f"{len(profile.paths):,} distinct paths in {profile.records:,} records")
+        if profile.untracked:
+            st.caption(f"⚠️ Path limit reached: {profile.untracked:,} values under further paths were not profiled")
+        st.dataframe(profile.rows())
+
+# Function to profile every JSONL record in batches, updating the table as records are parsed
+def display_schema_profile(line_index, source_key, current_document):
+    if line_index is None:
+        # A single document is profiled at once, with arrays collapsed to [*]
+        if current_document['schema_profile'] is None:
+            lazy_document = current_document.get('lazy')
+            if lazy_document is None:
+                current_document['schema_profile'] = SchemaProfile()
+                current_document['schema_profile'].add(current_document['json'])
+            elif st.button("▶ Profile whole document"):
+                # Decodes every subtree once, one at a time
+                with st.spinner(f"Profiling {format_size(len(lazy_document.buffer))}..."):
+                    profile = SchemaProfile()
+                    profile.add_nodes(lazy_document.iter_nodes(collapse_arrays=True))
+                current_document['schema_profile'] = profile
+            else:
+                st.info("This large file is opened lazily. Profiling it decodes every subtree once.")
+                return
+        display_profile_table(current_document['schema_profile'], st.empty())
+        return
+    
+    state = st.session_state.get('schema_profile')
+    if state is None or state['key'] != source_key:
+        state = st.session_state['schema_profile'] = {
+            'key': source_key,
+            'profile': SchemaProfile(),
+            'next_record': 0,
+            'bad_lines': 0,
+        }
+    total_records = len(line_index)
+    
+    col_batch, col_next, col_all, col_reset = st.columns(4)
+    with col_batch:
+        batch_size = st.number_input("Records per batch:", min_value=100, max_value=1_000_000, value=10_000,
+                                     step=1000, key='profile_batch_size')
+    with col_next:
+        profile_next = st.button("▶ Profile next batch", disabled=state['next_record'] >= total_records)
+    with col_all:
+        profile_all = st.button("⏩ Profile all records", disabled=state['next_record'] >= total_records)
+    with col_reset:
+        if st.button("🔄 Reset profile"):
+            state['profile'] = SchemaProfile()
+            state['next_record'] = 0
+            state['bad_lines'] = 0
+    
+    progress = st.progress(state['next_record'] / total_records,
+                           text=f"Profiled {state['next_record']:,} of {total_records:,} records")
+    table = st.empty()
+    
+    if profile_next or profile_all:
+        stop = total_records if profile_all else min(state['next_record'] + batch_size, total_records)
+        while state['next_record'] < stop:
+            batch_stop = min(state['next_record'] + batch_size, stop)
+            for record_index in range(state['next_record'], batch_stop):
+                try:
+                    state['profile'].add(line_index.record(record_index))
+                except ValueError:
+                    state['bad_lines'] += 1
+            state['next_record'] = batch_stop
+            progress.progress(batch_stop / total_records,
+                              text=f"Profiled {batch_stop:,} of {total_records:,} records")
+            display_profile_table(state['profile'], table)
+    
+    if state['bad_lines']:
+        st.caption(f"⚠️ Skipped {state['bad_lines']:,} lines that are not valid JSON")
+    if state['profile'].records:
+        display_profile_table(state['profile'], table)
+    else:
+        table.info("Profile a batch of records to see the paths they contain.")
+
+# Function to run a wildcard path query over the current document or every JSONL record
+def display_path_query(current_document, line_index, source_key):
+    query_text = st.text_input(
+        "Path query:",
+        placeholder="data['items'][*]['id']",
+        key='path_query',
+        help="[*] matches every item or value, ..['key'] matches a key at any depth, "
+             "[?(@['price'] > 10)] keeps the children matching a condition, [1:5] slices a list",
+    ).strip()
+    if not query_text:
+        st.info("Examples: data['items'][*]['id'] · data..['id'] · data['items'][?(@['price'] > 10)]['name']")
+        return
+    try:
+        query = compile_query(query_text)
+    except QueryError as e:
+        st.error(f"❌ {e}")
+        return
+    
+    run_all = line_index is not None and st.checkbox(
+        f"Run over all {len(line_index):,} records", key='query_all_records',
+        help="Evaluate the query on every line of the JSONL input in one pass")
+    if st.button("📝 Generate loop code"):
+        st.session_state['generated_code'] = query.generate_code(jsonl=run_all)
+    
+    if run_all:
+        col_limit, col_run = st.columns([1, 3])
+        with col_limit:
+            limit = st.number_input("Stop after matches:", min_value=1, max_value=QUERY_MAX_MATCHES,
+                                    value=1000, step=100, key='record_query_limit')
+        with col_run:
+            st.write("")  # Align the button with the limit box
+            run_query = st.button("▶ Run over all records")
+        query_key = (source_key, query.text, limit)
+        if run_query:
+            record_query = RecordQuery(line_index, query, limit=limit)
+            progress = st.progress(0.0, text="Running query...")
+            matches = []
+            for batch in record_query:
+                matches.extend(batch)
+                progress.progress(record_query.records_done / len(line_index),
+                                  text=f"Queried {record_query.records_done:,} of {len(line_index):,} records · "
+                                       f"{len(matches):,} matches")
+            progress.empty()
+            st.session_state['record_query'] = {
+                'key': query_key,
+                'matches': matches,
+                'stopped_early': record_query.stopped_early,
+                'records_done': record_query.records_done,
+                'bad_lines': record_query.bad_lines,
+            }
+        result = st.session_state.get('record_query')
+        if not result or result['key'] != query_key:
+            st.info("Press ▶ Run over all records to evaluate the query on every record.")
+            return
+        matches = result['matches']
+        summary = f"{len(matches):,} matches in {len({r for r, _, _ in matches}):,} records"
+        if result['stopped_early']:
+            summary += f" (stopped after {result['records_done']:,} records)"
+        st.write(summary)
+        if result['bad_lines']:
+            st.caption(f"⚠️ Skipped {result['bad_lines']:,} lines that are not valid JSON")
+        st.dataframe([{'Record': r + 1, 'Path': p, 'Value': preview_match(v)} for r, p, v in matches])
+        return
+    
+    # Evaluated on request only: a query over a lazily opened document decodes every subtree it reaches
+    query_key = (source_key, st.session_state['selected_jsonl_index'] if line_index is not None else None,
+                 query.text)
+    if st.button("▶ Run query"):
+        # Subtrees of a lazily opened document are decoded through the cache, as in the Tree Explorer
+        lazy_document = current_document.get('lazy')
+        resolve = None
+        if lazy_document is not None:
+            resolve = lambda value: (load_subtree(source_key, lazy_document, value)['json']
+                                     if isinstance(value, LazyValue) else value)
+        try:
+            matches = list(islice(query.evaluate(current_document['json'], resolve=resolve), QUERY_MAX_MATCHES + 1))
+        except ValueError as e:
+            st.error(f"❌ Cannot decode part of the document: {e}")
+            return
+        st.session_state['document_query'] = {'key': query_key, 'matches': matches}
+    result = st.session_state.get('document_query')
+    if not result or result['key'] != query_key:
+        st.info("Press ▶ Run query to evaluate the query on " +
+                ("this record." if line_index is not None else "the document."))
+        return
+    matches = result['matches']
+    if not matches:
+        st.info("The query matches nothing in this document.")
+        return
+    if len(matches) > QUERY_MAX_MATCHES:
+        st.write(f"More than {QUERY_MAX_MATCHES:,} matches, showing the first {QUERY_MAX_MATCHES:,}")
+    else:
+        st.write(f"{len(matches):,} match{'es' if len(matches) != 1 else ''}")
+    st.dataframe([{'Path': p, 'Value': preview_match(v)} for p, v in matches[:QUERY_MAX_MATCHES]])
+
+# Function to filter and sort every JSONL record with vectorized expressions over flattened columns
+def display_record_filter(line_index, source, source_key):
+    col_filter, col_sort = st.columns([3, 2])
+    with col_filter:
+        expression = st.text_input(
+            "Filter records:", placeholder="age > 30 and address.city == 'Othertown'", key='record_filter_expression',
+            help="Compare columns with ==, !=, <, >, in (...), is None; combine with and, or, not. "
+                 "Only is None matches missing values, even under not. Name a column by its keys: address.city, tags[0] or data['address']['city']",
+        ).strip()
+    with col_sort:
+        sort_text = st.text_input("Sort by:", placeholder="age desc, name", key='record_filter_sort').strip()
+    if not expression and not sort_text:
+        st.info("Examples: age > 30 and address.city == 'Othertown' · tags[0] in ('red', 'blue') · email is None")
+        return
+    try:
+        record_filter = compile_filter(expression) if expression else None
+        sort_keys = parse_sort(sort_text)
+    except ColumnError as e:
+        st.error(f"❌ {e}")
+        return
+    
+    # Flatten the columns the expressions use, once per source
+    if source['columns'] is None:
+        source['columns'] = ColumnStore(line_index)
+    store = source['columns']
+    paths = (record_filter.paths if record_filter else []) + [keys for keys, _ in sort_keys]
+    missing = store.missing(paths)
+    if missing:
+        progress = st.progress(0.0, text="Flattening columns...")
+        for _ in store.load(missing):
+            progress.progress(store.records_done / len(line_index),
+                              text=f"Flattening {len(missing)} column{'s' if len(missing) > 1 else ''}: "
+                                   f"{store.records_done:,} of {len(line_index):,} records")
+        progress.empty()
+    try:
+        indices = np.flatnonzero(record_filter.evaluate(store) if record_filter else store.valid())
+        if sort_keys:
+            indices = sort_records(store, indices, sort_keys)
+    except ColumnError as e:
+        st.error(f"❌ {e}")
+        return
+    
+    # Keep the result for the JSONL Navigator, and where it is in it while the expressions are unchanged
+    filter_key = (source_key, expression, sort_text)
+    filter_state = st.session_state.get('record_filter')
+    if not filter_state or filter_state['key'] != filter_key:
+        filter_state = st.session_state['record_filter'] = {'key': filter_key, 'position': 0, 'active': False}
+    filter_state['indices'] = indices
+    
+    st.write(f"{len(indices):,} of {len(line_index):,} records match")
+    if store.bad is not None and store.bad.any():
+        st.caption(f"⚠️ Skipped {int(store.bad.sum()):,} lines that are not valid JSON")
+    st.button("🧭 Step through the matches in the JSONL Navigator", disabled=not len(indices),
+              on_click=set_record_filter_active, args=(filter_state, True))
+    
+    shown = indices[:FILTER_PREVIEW_ROWS]
+    table = {'Record': (shown + 1).tolist()}
+    for keys in dict.fromkeys(paths):
+        table[format_column(keys)] = store.columns[keys].values(shown)
+    if len(indices) > FILTER_PREVIEW_ROWS:
+        st.caption(f"Showing the first {FILTER_PREVIEW_ROWS} matching records")
+    st.dataframe(table)
+
+# Function to pick the document the Diff tab compares the current one with
+def select_diff_document(line_index, source_key):
+    """Return (document, label) for the other side of the diff, or (None, None)"""
+    doc_cache = st.session_state['doc_cache']
+    options = (["Another record"] if line_index is not None else []) + ["Pasted JSON", "File on disk"]
+    compare_with = st.radio("Compare with:", options, horizontal=True, key='diff_source')
+    try:
+        if compare_with == "Another record":
+            default = min(st.session_state['selected_jsonl_index'] + 2, len(line_index))
+            record_number = st.number_input("Record:", min_value=1, max_value=len(line_index), value=default,
+                                            step=1, key='diff_record_number')
+            record_start, record_end = line_index.span(record_number - 1)
+            # Shares the navigator's cache entry, and so its hashes, for that record
+            document = doc_cache.get_or_create(
+                (source_key, record_number - 1),
+                lambda: new_document(line_index.record(record_number - 1)),
+                weight=record_end - record_start,
+            )
+            return document, f"record {record_number:,}"
+        if compare_with == "Pasted JSON":
+            text = st.text_area("Other JSON document:", height=150, key='diff_text').strip()
+            if not text:
+                return None, None
+            document = doc_cache.get_or_create(('diff text', content_key(text)),
+                                               lambda: new_document(loads(text)), weight=len(text))
+            return document, "the pasted document"
+        path = st.text_input("Path to the other JSON file:", key='diff_path').strip()
+        if not path:
+            return None, None
+        file_stat = os.stat(path)
+        
+        def load_file():
+            with open(path, 'rb') as f:
+                return new_document(loads(f.read()))
+        
+        document = doc_cache.get_or_create(('diff path', path, file_stat.st_size, file_stat.st_mtime_ns),
+                                           load_file, weight=file_stat.st_size)
+        return document, os.path.basename(path)
+    except OSError as e:
+        st.error(f"❌ Cannot read file: {e}")
+    except ValueError as e:
+        st.error(f"❌ Not a single JSON document: {e}")
+    return None, None
+
+# Function to list the added, removed and changed paths between the current document and another one
+def display_diff(current_document, line_index, source_key):
+    if current_document.get('lazy') is not None:
+        st.info("Diff is not available for large files opened lazily.")
+        return
+    other_document, other_label = select_diff_document(line_index, source_key)
+    if other_document is None:
+        st.info("Choose a document to compare the current one with.")
+        return
+    
+    swap = st.checkbox("Swap sides", key='diff_swap', help="Show the changes from the other document to this one")
+    before, after = (other_document, current_document) if swap else (current_document, other_document)
+    before_index, after_index = get_node_index(before), get_node_index(after)
+    changes = list(islice(diff_documents(before_index, get_subtree_hashes(before),
+                                         after_index, get_subtree_hashes(after)), DIFF_MAX_CHANGES + 1))
+    if not changes:
+        st.success(f"✅ No differences from {other_label}")
+        return
+    
+    stopped_early = len(changes) > DIFF_MAX_CHANGES
+    changes = changes[:DIFF_MAX_CHANGES]
+    counts = {change: sum(1 for c, _, _ in changes if c == change) for change in (ADDED, REMOVED, CHANGED)}
+    direction = f"from {other_label} to this document" if swap else f"from this document to {other_label}"
+    st.write(f"{len(changes):,} differences {direction}: ➕ {counts[ADDED]:,} added · "
+             f"➖ {counts[REMOVED]:,} removed · ✏️ {counts[CHANGED]:,} changed" +
+             (f" (stopped after the first {DIFF_MAX_CHANGES:,})" if stopped_early else ""))
+    
+    icons = {ADDED: "➕ added", REMOVED: "➖ removed", CHANGED: "✏️ changed"}
+    rows = []
+    for change, before_id, after_id in changes:
+        rows.append({
+            'Change': icons[change],
+            # Removed paths only exist before; list items may sit at another index after
+            'Path': (before_index.path(before_id, before['root_path']) if after_id is None
+                     else after_index.path(after_id, after['root_path'])),
+            'Before': None if before_id is None else before_index.preview(before_id),
+            'After': None if after_id is None else after_index.preview(after_id),
+        })
+    st.dataframe(rows)
+
+# Function to show the timings, element counts and memory of this rerun and the ones before it
+def display_perf_panel(record, history):
+    st.caption(f"This rerun: {record['total_seconds'] * 1000:,.0f} ms · {record['widget_total']:,} elements")
+    stage_allocations = record.get('stage_alloc_bytes', {})
+    st.dataframe([
+        {
+            'Stage': stage,
+            'ms': round(seconds * 1000, 1),
+            'Alloc KB': round(stage_allocations[stage] / 1024, 1) if stage in stage_allocations else None,
+        }
+        for stage, seconds in record['stages'].items()
+    ], hide_index=True)
+    if record['widgets']:
+        st.caption("Elements: " + ", ".join(f"{name} {count:,}" for name, count in
+                                             sorted(record['widgets'].items(), key=lambda item: -item[1])))
+    if record['rss_bytes'] is not None:
+        st.caption(f"RSS {format_size(record['rss_bytes'])} ({record['rss_delta_bytes'] / 1024 / 1024:+.1f} MB this rerun)")
+    if 'alloc_delta_bytes' in record:
+        st.caption(f"Python allocations: {record['alloc_delta_bytes'] / 1024 / 1024:+.1f} MB net, "
+                   f"{record['alloc_peak_bytes'] / 1024 / 1024:.1f} MB peak")
+    st.checkbox("Trace Python allocations", key='perf_trace_alloc',
+                help="Runs tracemalloc from the next rerun on; this slows the app down noticeably")
+    
+    if len(history) > 1:
+        st.write(f"Last {len(history)} reruns (ms)")
+        st.line_chart([{stage: seconds * 1000 for stage, seconds in r['stages'].items()} for r in history])
+    st.download_button("⬇️ Export history (JSONL)", data="".join(json.dumps(r) + "\n" for r in history),
+                       file_name="json_explorer_perf.jsonl", mime="application/x-ndjson")
 
 # Streamlit app configuration
 st.set_page_config(
@@ -141,58 +912,184 @@ with st.sidebar:
     if st.button("📝 Load Example JSON"):
         load_example()
     
-    json_input = st.text_area(
-        "Paste your JSON or JSON Lines (JSONL) here:",
-        height=250,
-        placeholder='Enter JSON or JSON Lines (JSONL) data here...',
-        key='json_input',
-    ).strip()
+    input_source = st.radio(
+        "Input source:",
+        ["Paste text", "Upload file", "File on disk"],
+        horizontal=True,
+        key='input_source',
+    )
 
-    if st.button("🔄 Clear JSON"):
-        st.session_state['json_input'] = ''
-        st.session_state['generated_code'] = ''
-        st.session_state['search_results'] = []
-        st.session_state.expanded_keys.clear()
+    json_input = ''
+    uploaded_file = None
+    file_path = ''
+    if input_source == "Paste text":
+        json_input = st.text_area(
+            "Paste your JSON or JSON Lines (JSONL) here:",
+            height=250,
+            placeholder='Enter JSON or JSON Lines (JSONL) data here...',
+            key='json_input',
+        ).strip()
 
-    # Parse JSON or JSONL
-    try:
-        if json_input:
-            parsed_json = json.loads(json_input)
-            is_jsonl = False
-            json_objects = [parsed_json]
-        else:
-            json_objects = []
-            is_jsonl = False
-    except json.JSONDecodeError:
+        if st.button("🔄 Clear JSON"):
+            st.session_state['json_input'] = ''
+            st.session_state['generated_code'] = ''
+            st.session_state['search_results'] = []
+    elif input_source == "Upload file":
+        uploaded_file = st.file_uploader(
+            "Upload a JSON or JSONL file:",
+            type=["json", "jsonl", "ndjson", "txt"],
+        )
+    else:
+        file_path = st.text_input(
+            "Path to a JSON or JSONL file on the server:",
+            placeholder="/data/export.jsonl",
+        ).strip()
+
+    # Parse JSON or JSONL, reusing the cached parse while the input is unchanged
+    doc_cache = st.session_state['doc_cache']
+    source_key = None
+    source = None
+    with perf.stage('parse'):
         try:
-            json_objects = [json.loads(line) for line in json_input.splitlines() if line.strip()]
-            is_jsonl = True
-        except json.JSONDecodeError:
+            if json_input:
+                source_key = ('text', content_key(json_input))
+                source = doc_cache.get_or_create(source_key, lambda: new_source(parse_text(json_input)),
+                                                 weight=len(json_input))
+            elif uploaded_file is not None:
+                source_key = ('upload', uploaded_file.file_id)
+                source = doc_cache.get_or_create(
+                    source_key,
+                    lambda: new_source(parse_buffer(uploaded_file.getvalue(), uploaded_file.name)),
+                    weight=uploaded_file.size,
+                )
+            elif file_path:
+                file_stat = os.stat(file_path)
+                source_key = ('path', file_path, file_stat.st_size, file_stat.st_mtime_ns)
+                # Mapped files are not held in memory, so a lazy document only weighs its decoded skeleton
+                # and a JSONL file its line offsets
+                source = doc_cache.get_or_create(
+                    source_key,
+                    lambda: new_source(parse_path(file_path)),
+                    weight=lambda source: source['lazy'].skeleton_size if 'lazy' in source
+                    else source['line_index'].index_size if 'line_index' in source else file_stat.st_size,
+                )
+        except OSError as e:
+            st.error(f"❌ Cannot read file: {e}")
+        except json.JSONDecodeError as e:
+            st.error(f"❌ Invalid JSON or JSONL data: {e}")
+        except (ValueError, IndexError):
             st.error("❌ Invalid JSON or JSONL data")
-            json_objects = []
-            is_jsonl = False
+    # The input in use is never evicted, however much its records and subtrees weigh
+    doc_cache.pinned = source_key
+
+    # Start from the first record whenever a different input is loaded
+    if source_key != st.session_state.get('active_source_key'):
+        previous_source = st.session_state.get('active_source')
+        if previous_source is not None:
+            cancel_line_check(previous_source)
+        st.session_state['active_source_key'] = source_key
+        st.session_state['active_source_since'] = time.monotonic()
+        st.session_state['selected_jsonl_index'] = 0
+        st.session_state['jsonl_record_number'] = 1
+
+    st.session_state['active_source'] = source
 
-    if is_jsonl and json_objects:
+    current_document = None
+    line_index = None
+    if source is not None and 'line_index' in source and len(source['line_index']):
+        line_index = source['line_index']
         st.subheader("JSONL Navigator")
-        selected_index = st.selectbox(
-            "Choose an object to display",
-            [f"Object {i+1}" for i in range(len(json_objects))],
-            index=st.session_state['selected_jsonl_index']
-        )
-        st.session_state['selected_jsonl_index'] = [f"Object {i+1}" for i in range(len(json_objects))].index(selected_index)
-        current_json = json_objects[st.session_state['selected_jsonl_index']]
-    elif json_objects:
-        current_json = json_objects[0]
-    else:
-        current_json = None
+        total_records = len(line_index)
+        if not 1 <= st.session_state['jsonl_record_number'] <= total_records:
+            st.session_state['jsonl_record_number'] = 1
+
+        nav_prev, nav_number, nav_next = st.columns([1, 2, 1])
+        with nav_prev:
+            st.button("◀", key="jsonl_prev", on_click=step_jsonl_record, args=(-1, total_records),
+                      disabled=st.session_state['jsonl_record_number'] <= 1)
+        with nav_number:
+            st.number_input(
+                "Jump to record",
+                min_value=1,
+                max_value=total_records,
+                step=1,
+                key='jsonl_record_number',
+                label_visibility="collapsed",
+            )
+        with nav_next:
+            st.button("▶", key="jsonl_next", on_click=step_jsonl_record, args=(1, total_records),
+                      disabled=st.session_state['jsonl_record_number'] >= total_records)
+
+        # Step through the records matched in the Filter Records tab
+        record_filter = st.session_state.get('record_filter')
+        if record_filter and record_filter['key'][0] == source_key and record_filter['active']:
+            match_prev, match_info, match_next, match_close = st.columns([1, 2, 1, 1])
+            with match_prev:
+                st.button("◀", key="filter_prev", on_click=step_filtered_record, args=(record_filter, -1),
+                          disabled=record_filter['position'] <= 0)
+            with match_info:
+                st.caption(f"Match {record_filter['position'] + 1:,} of {len(record_filter['indices']):,}")
+            with match_next:
+                st.button("▶", key="filter_next", on_click=step_filtered_record, args=(record_filter, 1),
+                          disabled=record_filter['position'] >= len(record_filter['indices']) - 1)
+            with match_close:
+                st.button("✖", key="filter_close", help="Step through all records again",
+                          on_click=set_record_filter_active, args=(record_filter, False))
+
+        selected_index = st.session_state['jsonl_record_number'] - 1
+        st.session_state['selected_jsonl_index'] = selected_index
+        selected_line = line_index.line_number(selected_index)
+        st.caption(f"Record {selected_index + 1:,} of {total_records:,} (line {selected_line:,})")
+        
+        # Records stay raw bytes and are decoded one at a time; show what that saves over decoding them all
+        if source['memory'] is None:
+            source['memory'] = jsonl_memory(line_index)
+        memory = source['memory']
+        held = memory['index_bytes'] + (0 if memory['mapped'] else memory['buffer_bytes'])
+        if memory['decoded_bytes']:
+            st.caption(f"💾 Holding {format_size(held)}" + (" plus the mapped file" if memory['mapped'] else "") +
+                       f"; decoding every record would take about {format_size(memory['decoded_bytes'])}")
+
+        # Every line is decoded in worker processes while the navigator stays usable
+        if source['line_check'] is None:
+            display_line_check_pending(source)
+        else:
+            display_line_check(source['line_check'])
+        record_start, record_end = line_index.span(selected_index)
+        with perf.stage('parse'):
+            try:
+                current_document = doc_cache.get_or_create(
+                    (source_key, selected_index),
+                    lambda: new_document(line_index.record(selected_index)),
+                    weight=record_end - record_start,
+                )
+            except ValueError as e:
+                st.error(f"❌ Line {selected_line:,} is not valid JSON: {e}")
+    elif source is not None and 'json' in source:
+        current_document = source
+        if 'lazy' in source:
+            lazy_document = source['lazy']
+            st.caption(f"💤 Large file: {len(lazy_document.lazy_values):,} subtrees "
+                       f"({format_size(lazy_document.lazy_bytes)}) are decoded only when opened or searched")
+
+    current_json = current_document['json'] if current_document else None
+
+    cache_stats = doc_cache.stats()
+    st.caption(f"🗄️ Parse cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · "
+               f"{cache_stats['entries']} entries")
 
 # Main content area
 if current_json:
     # Create tabs for different views
-    tab1, tab2 = st.tabs(["🔎 Path Finder", "🌲 Tree Explorer"])
+    tab_names = ["🔎 Path Finder", "🌲 Tree Explorer", "📊 Schema Profile", "🧭 Path Query", "🔀 Diff"]
+    if line_index is not None:
+        tab_names.append("🧮 Filter Records")
+    tab1, tab2, tab3, tab4, tab5, *filter_tab = st.tabs(tab_names)
     
-    # Extract all paths from JSON
-    all_paths = extract_paths(current_json)
+    # Build the path index once per cached document; both views read from it
+    with perf.stage('index'):
+        node_index = get_node_index(current_document)
+    lazy_document = current_document.get('lazy')
     
     # Path Finder View
     with tab1:
@@ -212,98 +1109,95 @@ if current_json:
             )
             st.session_state['display_mode'] = 'keys' if display_mode == "Show Keys" else 'values'
             
-        # Filter paths based on search query
-        if search_query:
-            if st.session_state['display_mode'] == 'keys':
-                # Search in keys
-                search_results = [
-                    path for path in all_paths 
-                    if search_query.lower() in path[0].lower()
-                ]
-            else:
-                # Search in values
-                search_results = [
-                    path for path in all_paths 
-                    if isinstance(path[3], (str, int, float, bool)) and 
-                    search_query.lower() in str(path[3]).lower()
-                ]
-            st.session_state['search_results'] = search_results
-        else:
-            st.session_state['search_results'] = all_paths[:100]  # Limit to first 100 paths if no search
+        # Search every JSONL record instead of only the one shown in the navigator
+        search_all_records = line_index is not None and st.checkbox(
+            f"Search all {len(line_index):,} records", key='search_all_records',
+            help="Match keys or values across every line of the JSONL input using a pool of worker processes")
+        # Search inside the subtrees of a lazily opened document instead of only its top levels
+        search_subtrees = lazy_document is not None and st.checkbox(
+            f"Search inside {len(lazy_document.lazy_values):,} unloaded subtrees", key='search_subtrees',
+            help="Decode and search each subtree in turn; only the top levels are searched otherwise")
         
-        # Display search results
-        if st.session_state['search_results']:
-            results_count = len(st.session_state['search_results'])
-            st.write(f"Found {results_count} paths" + 
-                    (f" (showing first 100)" if results_count > 100 and not search_query else ""))
-            
-            # Group results if in value mode
+        if search_all_records:
+            with perf.stage('search'):
+                display_record_search(line_index, source_key, search_query, st.session_state['display_mode'])
             if st.session_state['display_mode'] == 'values':
-                # Create value-based groups
-                value_groups = defaultdict(list)
-                for path_info in st.session_state['search_results'][:100]:
-                    if len(path_info) >= 4:  # Make sure we have value data
-                        value = str(path_info[3])
-                        # Truncate very long values for grouping
-                        if len(value) > 50:
-                            value = value[:47] + "..."
-                        value_groups[value].append(path_info)
-                
-                # Display grouped by value
-                for value, paths in value_groups.items():
-                    with st.expander(f"Value: {value} ({len(paths)} occurrences)"):
-                        for i, path_info in enumerate(paths):
-                            path, preview = path_info[0], path_info[1]
-                            # Create unique key for each button
-                            key = f"value_path_{i}_{hash(path)}"
-                            
-                            col1, col2 = st.columns([3, 1])
-                            with col1:
-                                st.markdown(f"<div class='path-display'>{path}</div>", unsafe_allow_html=True)
-                            with col2:
-                                if st.button("Get Path", key=key):
-                                    st.session_state['generated_code'] = generate_python_code(path)
+                st.divider()
+                with perf.stage('value counts'):
+                    display_record_value_counts(line_index, source_key, search_query)
+        elif search_subtrees:
+            with perf.stage('search'):
+                display_subtree_search(lazy_document, source_key, search_query, st.session_state['display_mode'])
+        else:
+            # Filter leaf nodes based on search query, using the document's search index
+            if search_query:
+                with perf.stage('search'):
+                    if current_document['path_search'] is None:
+                        current_document['path_search'] = PathSearch(node_index)
+                    if st.session_state['display_mode'] == 'keys':
+                        # Search in keys
+                        search_results = current_document['path_search'].search_keys(search_query)
+                    else:
+                        # Search in values
+                        search_results = current_document['path_search'].search_values(search_query)
+                st.session_state['search_results'] = search_results
+                results_count = len(search_results)
             else:
-                # Show paths in a scrollable container (key mode)
-                with st.container():
-                    for i, path_info in enumerate(st.session_state['search_results'][:100]):
-                        path, preview = path_info[0], path_info[1]
-                        # Create unique key for each button
-                        key = f"path_{i}_{hash(path)}"
+                st.session_state['search_results'] = node_index.leaves[:100]  # Limit to first 100 paths if no search
+                results_count = len(node_index.leaves)
+        
+            with perf.stage('render path finder'):
+                # Display search results
+                if st.session_state['search_results']:
+                    # Group results by value in value mode, counting every result
+                    if st.session_state['display_mode'] == 'values':
+                        display_value_counts(current_document, node_index, search_query)
+                    else:
+                        st.write(f"Found {results_count} paths" + 
+                                (f" (showing first 100)" if results_count > 100 and not search_query else ""))
+
+                        # Show paths in a scrollable container (key mode)
+                        with st.container():
+                            for node_id in st.session_state['search_results'][:100]:
+                                path, preview = node_index.path(node_id), node_index.preview(node_id)
                         
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.markdown(f"""
-                            <div class="search-result">
-                                <div class="path-display">{path}</div>
-                                <div class="value-preview">Value: {preview}</div>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        with col2:
-                            if st.button("Get Path", key=key):
-                                st.session_state['generated_code'] = generate_python_code(path)
-        else:
-            st.info("No paths found matching your search.")
+                                col1, col2 = st.columns([3, 1])
+                                with col1:
+                                    st.markdown(f"""
+                                    <div class="search-result">
+                                        <div class="path-display">{path}</div>
+                                        <div class="value-preview">Value: {preview}</div>
+                                    </div>
+                                    """, unsafe_allow_html=True)
+                                with col2:
+                                    if st.button("Get Path", key=f"finder_path_{node_id}"):
+                                        st.session_state['generated_code'] = generate_python_code(path)
+                else:
+                    st.info("No paths found matching your search.")
     
     # Tree Explorer View
     with tab2:
-        # Option to expand all or collapse all
-        col_expand, col_collapse, col_mode = st.columns(3)
+        # Expansion state and page offsets belong to the cached document and are keyed by node id
+        expanded_nodes = current_document['expanded']
+        page_offsets = current_document['page_offsets']
+        
+        # Option to expand all, collapse all or expand to a given depth
+        col_expand, col_collapse, col_depth, col_mode = st.columns(4)
         
         with col_expand:
             if st.button("🔽 Expand All"):
-                # Extract all unique prefixes from paths for expanding
-                for path, _, _, _ in all_paths:
-                    parts = re.findall(r"\['([^']+)'\]|\[(\d+)\]", path)
-                    current = []
-                    for part in parts:
-                        part = next(p for p in part if p)  # Get the non-empty part
-                        current.append(part)
-                        st.session_state.expanded_keys.add('_'.join(current))
+                expanded_nodes.update(node_index.containers)
         
         with col_collapse:
             if st.button("🔼 Collapse All"):
-                st.session_state.expanded_keys.clear()
+                expanded_nodes.clear()
+                page_offsets.clear()
+        
+        with col_depth:
+            expand_depth = st.number_input("Expand to depth:", min_value=1, value=2, step=1, key="tree_expand_depth")
+            if st.button("↕️ Apply depth"):
+                expanded_nodes.clear()
+                expanded_nodes.update(node_index.containers_to_depth(expand_depth))
         
         with col_mode:
             tree_display_mode = st.selectbox(
@@ -314,173 +1208,177 @@ if current_json:
             )
             st.session_state['display_mode'] = 'keys' if tree_display_mode == "Show Keys" else 'values'
         
-        # Function to recursively display JSON with expand/collapse controls
-        def display_collapsible_json(json_obj, path=None, level=0):
-            path = path or []
-            path_key = '_'.join(map(str, path))
+        with st.expander("⚙️ Rendering limits"):
+            col_page_size, col_widget_limit = st.columns(2)
+            with col_page_size:
+                st.number_input("Items per page", min_value=5, max_value=1000, step=5, key='tree_page_size',
+                                help="Dicts and lists with more children are shown one page at a time")
+            with col_widget_limit:
+                st.number_input("Max widgets per rerun", min_value=50, max_value=20000, step=50,
+                                key='tree_widget_limit',
+                                help="Rendering stops once this many widgets have been emitted")
+        
+        page_size = st.session_state['tree_page_size']
+        tree_budget = {'widgets': st.session_state['tree_widget_limit'], 'skipped': 0}
+        
+        # Function to show prev/next/jump controls for a container with more than one page of children
+        def display_page_controls(document, node_id, child_count, level, key_prefix):
+            """Render page controls and return the offset of the page to show"""
+            page_offsets = document['page_offsets']
+            last_offset = ((child_count - 1) // page_size) * page_size
+            offset = min(page_offsets.get(node_id, 0), last_offset)
+            jump_key = f"tree_jump_{key_prefix}{node_id}"
+            if not 0 <= st.session_state.get(jump_key, -1) < child_count:
+                st.session_state[jump_key] = offset
+            tree_budget['widgets'] -= TREE_PAGER_WIDGETS
             
-            if isinstance(json_obj, dict):
-                if not json_obj:  # Empty dict
-                    st.write("{}")
+            col_prev, col_info, col_jump, col_next = st.columns([0.1, 0.45, 0.3, 0.15])
+            with col_prev:
+                st.button("◀", key=f"tree_prev_{key_prefix}{node_id}", disabled=offset == 0,
+                          on_click=set_tree_page, args=(page_offsets, node_id, max(offset - page_size, 0), jump_key))
+            with col_info:
+                st.markdown(f"<span style='color:#7f8c8d; margin-left: {level*20}px;'>Items {offset:,}–{min(offset + page_size, child_count) - 1:,} of {child_count:,}</span>", unsafe_allow_html=True)
+            with col_jump:
+                st.number_input("Go to item", min_value=0, max_value=child_count - 1, step=1,
+                                key=jump_key, label_visibility="collapsed",
+                                on_change=jump_tree_page, args=(page_offsets, node_id, page_size, jump_key))
+            with col_next:
+                st.button("▶", key=f"tree_next_{key_prefix}{node_id}", disabled=offset == last_offset,
+                          on_click=set_tree_page, args=(page_offsets, node_id, offset + page_size, jump_key))
+            return offset
+        
+        # Function to recursively display JSON with expand/collapse controls.
+        # Subtrees of a lazily opened document are separate documents, rendered with a key prefix
+        # so that their node ids do not clash with the top-level document's widget keys.
+        def display_collapsible_json(document, node_id, level=0, key_prefix=""):
+            node_index = get_node_index(document)
+            expanded_nodes = document['expanded']
+            root_path = document['root_path']
+            if not node_index.is_container(node_id):
+                return
+            child_count = node_index.child_count(node_id)
+            if not child_count:  # Empty dict or list
+                st.write("{}" if node_index.kind[node_id] == DICT else "[]")
+                return
+            
+            # Show one page of children at a time for large containers
+            offset = 0
+            if child_count > page_size and tree_budget['widgets'] >= TREE_PAGER_WIDGETS + TREE_BRANCH_WIDGETS:
+                offset = display_page_controls(document, node_id, child_count, level, key_prefix)
+            
+            is_list = node_index.kind[node_id] == LIST
+            page = node_index.child_ids(node_id, offset, offset + page_size)
+            for position, child_id in enumerate(page):
+                value = node_index.values[child_id]
+                is_lazy = isinstance(value, LazyValue)  # Subtree of a large file that is decoded on expand
+                is_branch = node_index.is_container(child_id) or is_lazy
+                row_widgets = TREE_BRANCH_WIDGETS if is_branch else TREE_LEAF_WIDGETS
+                # Stop once this rerun's widget budget is spent
+                if tree_budget['widgets'] < row_widgets:
+                    tree_budget['skipped'] += len(page) - position
                     return
+                tree_budget['widgets'] -= row_widgets
                 
-                for key, value in json_obj.items():
-                    new_path = path + [key]
-                    new_path_key = '_'.join(map(str, new_path))
-                    
+                key = node_index.key_of(child_id)
+                label = f"[{key}]" if is_list else key
+                widget_id = f"{key_prefix}{child_id}"
+                
+                # Render toggle control + key/value
+                if is_branch:
                     # Determine if this node should be expanded
-                    is_expanded = new_path_key in st.session_state.expanded_keys
+                    is_expanded = child_id in expanded_nodes
+                    expander_icon = "🔽" if is_expanded else "▶️"
                     
-                    # Render toggle control + key/value
-                    if isinstance(value, (dict, list)):
-                        expander_icon = "🔽" if is_expanded else "▶️"
-                        
-                        # Create a clickable row with key/value name and toggle icon
-                        col1, col2, col3 = st.columns([0.05, 0.75, 0.2])
-                        
-                        with col1:
-                            if st.button(expander_icon, key=f"toggle_{new_path_key}"):
-                                if is_expanded:
-                                    st.session_state.expanded_keys.remove(new_path_key)
-                                else:
-                                    st.session_state.expanded_keys.add(new_path_key)
-                                st.rerun()
-                        
-                        with col2:
-                            type_indicator = "{...}" if isinstance(value, dict) else "[...]"
-                            if st.session_state['display_mode'] == 'keys':
-                                # Display key name
-                                st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{key}</b></span> <span style='color:#7f8c8d;'>{type_indicator}</span>", unsafe_allow_html=True)
-                            else:
-                                # Display value summary
-                                item_count = len(value)
-                                st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{key}</b></span>: <span style='color:#D35400;'>{type(value).__name__} with {item_count} items</span>", unsafe_allow_html=True)
-                        
-                        with col3:
-                            # Generate path to this key
-                            path_str = "data"
-                            for p in new_path:
-                                if isinstance(p, int) or (isinstance(p, str) and p.isdigit()):
-                                    path_str += f"[{p}]"
-                                else:
-                                    path_str += f"['{p}']"
-                            
-                            if st.button("Get Path", key=f"path_{new_path_key}"):
-                                st.session_state['generated_code'] = generate_python_code(path_str)
-                        
-                        # Show contents if expanded
-                        if is_expanded:
-                            display_collapsible_json(value, new_path, level + 1)
-                    else:
-                        # Render leaf node (no children)
-                        col1, col2, col3 = st.columns([0.05, 0.75, 0.2])
-                        
-                        with col1:
-                            st.write("  ")  # Empty space for alignment
-                            
-                        with col2:
-                            # Format value display based on type
-                            if isinstance(value, str):
-                                value_display = f'"{value[:50]}{"..." if len(value) > 50 else ""}"'
-                            else:
-                                value_display = str(value)
-                            
-                            if st.session_state['display_mode'] == 'keys':
-                                st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{key}</b></span>: <span style='color:#D35400;'>{value_display}</span>", unsafe_allow_html=True)
-                            else:
-                                st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{key}</b></span>: <span style='color:#D35400;'>{value_display}</span>", unsafe_allow_html=True)
-                        
-                        with col3:
-                            # Generate path to this key
-                            path_str = "data"
-                            for p in new_path:
-                                if isinstance(p, int) or (isinstance(p, str) and p.isdigit()):
-                                    path_str += f"[{p}]"
-                                else:
-                                    path_str += f"['{p}']"
-                                    
-                            if st.button("Get Path", key=f"path_{new_path_key}"):
-                                st.session_state['generated_code'] = generate_python_code(path_str)
-            
-            elif isinstance(json_obj, list):
-                if not json_obj:  # Empty list
-                    st.write("[]")
-                    return
+                    # Create a clickable row with toggle, expand-subtree, key/value name and Get Path
+                    col1, col2, col3, col4 = st.columns([0.05, 0.05, 0.7, 0.2])
                     
-                for i, item in enumerate(json_obj):
-                    new_path = path + [i]
-                    new_path_key = '_'.join(map(str, new_path))
+                    with col1:
+                        st.button(expander_icon, key=f"toggle_{widget_id}", on_click=toggle_node,
+                                  args=(expanded_nodes, child_id))
                     
-                    # Determine if this node should be expanded
-                    is_expanded = new_path_key in st.session_state.expanded_keys
+                    with col2:
+                        st.button("⏬", key=f"subtree_{widget_id}", help="Expand everything below this node",
+                                  on_click=expand_subtree, args=(expanded_nodes, node_index, child_id),
+                                  disabled=is_lazy)
                     
-                    # Render toggle control + index
-                    if isinstance(item, (dict, list)):
-                        expander_icon = "🔽" if is_expanded else "▶️"
-                        
-                        col1, col2, col3 = st.columns([0.05, 0.75, 0.2])
-                        
-                        with col1:
-                            if st.button(expander_icon, key=f"toggle_{new_path_key}"):
-                                if is_expanded:
-                                    st.session_state.expanded_keys.remove(new_path_key)
-                                else:
-                                    st.session_state.expanded_keys.add(new_path_key)
-                                st.rerun()
-                        
-                        with col2:
-                            type_indicator = "{...}" if isinstance(item, dict) else "[...]"
-                            if st.session_state['display_mode'] == 'keys':
-                                st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>[{i}]</b></span> <span style='color:#7f8c8d;'>{type_indicator}</span>", unsafe_allow_html=True)
-                            else:
-                                item_count = len(item)
-                                st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>[{i}]</b></span>: <span style='color:#D35400;'>{type(item).__name__} with {item_count} items</span>", unsafe_allow_html=True)
-                        
-                        with col3:
-                            # Generate path to this index
-                            path_str = "data"
-                            for p in new_path:
-                                if isinstance(p, int) or (isinstance(p, str) and p.isdigit()):
-                                    path_str += f"[{p}]"
-                                else:
-                                    path_str += f"['{p}']"
-                                    
-                            if st.button("Get Path", key=f"path_{new_path_key}"):
-                                st.session_state['generated_code'] = generate_python_code(path_str)
-                        
-                        # Show contents if expanded
-                        if is_expanded:
-                            display_collapsible_json(item, new_path, level + 1)
-                    else:
-                        # Render leaf node (no children)
-                        col1, col2, col3 = st.columns([0.05, 0.75, 0.2])
+                    with col3:
+                        if is_lazy:
+                            type_indicator = "{...}" if value.is_dict else "[...]"
+                            is_loaded = (source_key, 'subtree', value.start) in st.session_state['doc_cache']
+                            summary = f"{format_size(value.size)}{'' if is_loaded else ', not loaded'}"
+                        else:
+                            type_indicator = "{...}" if node_index.kind[child_id] == DICT else "[...]"
+                        if st.session_state['display_mode'] == 'keys':
+                            # Display key name
+                            st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{label}</b></span> <span style='color:#7f8c8d;'>{type_indicator}</span>", unsafe_allow_html=True)
+                        elif is_lazy:
+                            st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{label}</b></span>: <span style='color:#D35400;'>{'dict' if value.is_dict else 'list'} of {summary}</span>", unsafe_allow_html=True)
+                        else:
+                            # Display value summary
+                            item_count = node_index.child_count(child_id)
+                            st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{label}</b></span>: <span style='color:#D35400;'>{type(value).__name__} with {item_count} items</span>", unsafe_allow_html=True)
+                    
+                    with col4:
+                        if st.button("Get Path", key=f"path_{widget_id}"):
+                            st.session_state['generated_code'] = generate_python_code(node_index.path(child_id, root_path))
+                    
+                    # Show contents if expanded
+                    if is_expanded and is_lazy:
+                        try:
+                            subtree = load_subtree(source_key, lazy_document, value)
+                        except ValueError as e:
+                            st.error(f"❌ {value.path()} is not valid JSON: {e}")
+                        else:
+                            display_collapsible_json(subtree, 0, level + 1, key_prefix=f"{widget_id}_")
+                    elif is_expanded:
+                        display_collapsible_json(document, child_id, level + 1, key_prefix)
+                else:
+                    # Render leaf node (no children)
+                    col1, col2, col3 = st.columns([0.1, 0.7, 0.2])
+                    
+                    with col1:
+                        st.write("  ")  # Empty space for alignment
                         
-                        with col1:
-                            st.write("  ")  # Empty space for alignment
-                            
-                        with col2:
-                            # Format value display based on type
-                            if isinstance(item, str):
-                                value_display = f'"{item[:50]}{"..." if len(item) > 50 else ""}"'
-                            else:
-                                value_display = str(item)
-                                
-                            st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>[{i}]</b></span>: <span style='color:#D35400;'>{value_display}</span>", unsafe_allow_html=True)
+                    with col2:
+                        # Format value display based on type
+                        if isinstance(value, str):
+                            value_display = f'"{value[:50]}{"..." if len(value) > 50 else ""}"'
+                        else:
+                            value_display = str(value)
                         
-                        with col3:
-                            # Generate path to this index
-                            path_str = "data"
-                            for p in new_path:
-                                if isinstance(p, int) or (isinstance(p, str) and p.isdigit()):
-                                    path_str += f"[{p}]"
-                                else:
-                                    path_str += f"['{p}']"
-                                    
-                            if st.button("Get Path", key=f"path_{new_path_key}"):
-                                st.session_state['generated_code'] = generate_python_code(path_str)
+                        st.markdown(f"<span style='color:#2E86C1; margin-left: {level*20}px;'><b>{label}</b></span>: <span style='color:#D35400;'>{value_display}</span>", unsafe_allow_html=True)
+                    
+                    with col3:
+                        if st.button("Get Path", key=f"path_{widget_id}"):
+                            st.session_state['generated_code'] = generate_python_code(node_index.path(child_id, root_path))
         
         # Display the collapsible JSON structure
-        display_collapsible_json(current_json)
+        with perf.stage('render tree'):
+            display_collapsible_json(current_document, 0)
+        if tree_budget['skipped']:
+            st.warning(f"⚠️ Widget limit reached: {tree_budget['skipped']:,} more rows were not rendered. "
+                       "Collapse some nodes or raise the limit under Rendering limits.")
+
+    # Schema Profile View
+    with tab3:
+        with perf.stage('schema profile'):
+            display_schema_profile(line_index, source_key, current_document)
+    
+    # Path Query View
+    with tab4:
+        with perf.stage('path query'):
+            display_path_query(current_document, line_index, source_key)
+    
+    # Diff View
+    with tab5:
+        with perf.stage('diff'):
+            display_diff(current_document, line_index, source_key)
+    
+    # Filter Records View (JSONL only)
+    if filter_tab:
+        with filter_tab[0]:
+            with perf.stage('filter records'):
+                display_record_filter(line_index, source, source_key)
 
 # Display generated code
 if st.session_state.get('generated_code'):
@@ -491,4 +1389,13 @@ if st.session_state.get('generated_code'):
     if st.button("📋 Copy Code to Clipboard"):
         st.info("Code copied to clipboard! (Note: This is a UI simulation - in a real app, JavaScript would handle the copy operation)")
 else:
-    st.info("⚠️ Enter JSON data and select a path to generate access code.")
\ No newline at end of file
+    st.info("⚠️ Enter JSON data and select a path to generate access code.")
+
+# Finish this rerun's measurements before drawing the panel, so the panel is not measured itself
+perf_record = perf.finish()
+st.session_state['perf_history'].append(perf_record)
+with st.sidebar:
+    st.divider()
+    if st.checkbox("⏱️ Performance panel", key='perf_panel',
+                   help="Time each stage of every rerun and count the elements it emits"):
+        display_perf_panel(perf_record, st.session_state['perf_history'])
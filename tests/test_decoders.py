@@ -0,0 +1,61 @@
+"""Every decoder backend must decode, and reject, input exactly like the stdlib ``json``."""
+import json
+
+import pytest
+
+from benchmarks.decoders import check_decoders, decoder_inputs
+from json_explorer import decoder
+from json_explorer.decoder import BACKENDS, JSON, JSONL, detect_format, get_loads
+
+
+@pytest.mark.parametrize('data', decoder_inputs(), ids=repr)
+def test_backends_match_json(data):
+    assert check_decoders([data]) == []
+
+
+@pytest.mark.parametrize('name', sorted(BACKENDS))
+@pytest.mark.parametrize('text', [
+    '{"id": 12345678901234567890}',
+    '[-9223372036854775809, 1.5]',
+    '{"12345678901234567890": "x"}',
+    '"9223372036854775807 is the largest signed 64-bit integer"',
+])
+def test_long_digit_runs_stay_exact(name, text):
+    loads = BACKENDS[name]
+    assert loads(text) == json.loads(text)
+    assert loads(text.encode('utf-8')) == json.loads(text)
+
+
+@pytest.mark.skipif('orjson' not in BACKENDS, reason='orjson is not installed')
+@pytest.mark.parametrize('padding', range(20))
+def test_long_digit_runs_across_scan_windows(monkeypatch, padding):
+    monkeypatch.setattr(decoder, '_DIGIT_SCAN_BYTES', 16)
+    text = '[' + ' ' * padding + '123456789012345678901234567890]'
+    assert BACKENDS['orjson'](text) == [123456789012345678901234567890]
+
+
+def test_get_loads_rejects_unknown_backend():
+    with pytest.raises(ValueError, match='Unknown or uninstalled JSON decoder'):
+        get_loads('simdjson-nonexistent')
+
+
+@pytest.mark.skipif('orjson' not in BACKENDS, reason='orjson is not installed')
+def test_orjson_backend_decodes_with_orjson(monkeypatch):
+    calls = []
+    loads = decoder.orjson.loads
+    monkeypatch.setattr(decoder.orjson, 'loads', lambda raw: calls.append(raw) or loads(raw))
+    assert BACKENDS['orjson']('{"a": [1, 2]}') == {'a': [1, 2]}
+    assert BACKENDS['orjson']('[12345678901234567890]') == [12345678901234567890]
+    assert calls == [b'{"a": [1, 2]}']
+
+
+@pytest.mark.parametrize('data, expected', [
+    (b'', JSON),
+    (b'  {"a": 1}\n', JSON),
+    (b'{"a": 1}\n{"a": 2}\n', JSONL),
+    (b'{\n  "a": 1\n}\n', JSON),
+    (b'[1,\n 2]', JSON),
+    (b'{bad\n{"a": 2}\n{"a": 3}\n', JSONL),
+])
+def test_detect_format(data, expected):
+    assert detect_format(data) == expected